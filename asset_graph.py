@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Asset Reference Graph
+Follows references between the files of a built site (HTML attributes and
+srcsets, CSS url()s, JSON string values, feed and sitemap links) from a set
+of root files, to find which assets are reachable and which references
+point at files that don't exist.
+"""
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import unquote, urljoin, urlsplit
+
+
+HTML_ATTR_RE = re.compile(r'\s(?:href|src|poster|data)\s*=\s*(["\'])(.*?)\1', re.I)
+SRCSET_RE = re.compile(r'\ssrcset\s*=\s*(["\'])(.*?)\1', re.I)
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)', re.I)
+CSS_IMPORT_RE = re.compile(r'@import\s+([\'"])(.*?)\1', re.I)
+XML_LINK_RE = re.compile(r'href=(["\'])(.*?)\1|<loc>(.*?)</loc>', re.I)
+# Only file paths; directory prefixes that scripts build URLs from are skipped
+JS_PATH_RE = re.compile(r'([\'"`])(/static/[^\'"`\s]+\.\w+)\1')
+
+# References that never point at a file in the build
+IGNORED_SCHEMES = ('mailto:', 'tel:', 'javascript:', 'data:', 'about:')
+
+
+def file_references(path: Path, text: str) -> List[str]:
+    """Raw reference strings found in a file, by file type"""
+    suffix = path.suffix.lower()
+    if suffix in ('.html', '.htm'):
+        refs = [m.group(2) for m in HTML_ATTR_RE.finditer(text)]
+        for m in SRCSET_RE.finditer(text):
+            refs.extend(c.strip().split()[0] for c in m.group(2).split(',') if c.strip())
+        # Inline styles and <style> blocks
+        refs.extend(m.group(2) for m in CSS_URL_RE.finditer(text))
+        return refs
+    if suffix == '.css':
+        return [m.group(2) for m in CSS_URL_RE.finditer(text)] + \
+               [m.group(2) for m in CSS_IMPORT_RE.finditer(text)]
+    if suffix in ('.xml', '.svg'):
+        return [m.group(2) or m.group(3) for m in XML_LINK_RE.finditer(text)]
+    if suffix == '.js':
+        return [m.group(2) for m in JS_PATH_RE.finditer(text)]
+    if suffix in ('.json', '.jsonl'):
+        refs = []
+        for line in (text.splitlines() if suffix == '.jsonl' else [text]):
+            try:
+                refs.extend(_json_strings(json.loads(line)))
+            except ValueError:
+                continue
+        # Only strings that look like links; most JSON values are plain text
+        return [r for r in refs if r.startswith(('/', 'http://', 'https://', './', '../'))]
+    return []
+
+
+def _json_strings(value) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for v in value.values():
+            yield from _json_strings(v)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _json_strings(v)
+
+
+def resolve_reference(ref: str, base_url: str, site_url: str) -> Optional[str]:
+    """
+    Site-relative URL path a reference points at, or None if it points
+    outside the site (another host, mailto:, a bare fragment, ...).
+    """
+    ref = ref.strip()
+    if not ref or ref.startswith('#') or ref.lower().startswith(IGNORED_SCHEMES):
+        return None
+    if ref.startswith(site_url + '/') or ref == site_url:
+        ref = ref[len(site_url):] or '/'
+    parts = urlsplit(urljoin(base_url, ref))
+    if parts.scheme or parts.netloc:
+        return None
+    return unquote(parts.path)
+
+
+def url_to_file(output_dir: Path, url_path: str) -> Optional[Path]:
+    """The output file a URL path is served from, if it exists"""
+    path = output_dir / url_path.lstrip('/')
+    if url_path.endswith('/') or path.is_dir():
+        path = path / 'index.html'
+    return path if path.is_file() else None
+
+
+def file_url(output_dir: Path, path: Path) -> str:
+    """URL path a file in the output tree is served at"""
+    return '/' + path.relative_to(output_dir).as_posix()
+
+
+def reachable_files(output_dir: Path, roots: Iterable[Path], site_url: str,
+                    extra_sources: Dict[Path, str] = None) -> Tuple[Set[Path], List[Tuple[str, str]]]:
+    """
+    Walk the reference graph from roots.
+
+    `roots` are files in output_dir. `extra_sources` maps files outside the
+    output (e.g. source data files) to the URL their relative references are
+    resolved against. Returns the set of reachable output files and a list
+    of (referring file, reference) pairs that resolve to no file.
+    """
+    seen: Set[Path] = set()
+    broken: List[Tuple[str, str]] = []
+    queue: List[Tuple[Path, str, str]] = []
+
+    def visit(path: Path, base_url: str, label: str):
+        try:
+            text = path.read_text(encoding='utf-8')
+        except (OSError, UnicodeDecodeError):
+            return
+        for ref in file_references(path, text):
+            url_path = resolve_reference(ref, base_url, site_url)
+            if url_path is None:
+                continue
+            target = url_to_file(output_dir, url_path)
+            if target is None:
+                broken.append((label, ref))
+            elif target not in seen:
+                seen.add(target)
+                queue.append((target, file_url(output_dir, target), file_url(output_dir, target)))
+
+    for source, base_url in (extra_sources or {}).items():
+        visit(source, base_url, str(source))
+    for root in roots:
+        if root not in seen:
+            seen.add(root)
+            queue.append((root, file_url(output_dir, root), file_url(output_dir, root)))
+    while queue:
+        visit(*queue.pop())
+
+    return seen, sorted(set(broken))
@@ -3,39 +3,289 @@
 Static Site Generator for Personal Website
 Converts markdown and templates to static HTML files
 """
-import markdown
 import codecs
+import hashlib
 import json
+import os
+import re
 import time
 import shutil
 import subprocess
+import threading
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader, select_autoescape
 
-# Configuration
-SOURCE_DIR = Path('njwfish')
-OUTPUT_DIR = Path('site')
-STATIC_DIR = SOURCE_DIR / 'static'
-TEMPLATES_DIR = SOURCE_DIR / 'templates'
-POSTS_DIR = STATIC_DIR / 'posts'
+# markdown, jinja2 and the feed/search modules are imported by the stages
+# that use them, so builds (and tools importing this module) that never
+# reach those stages don't pay for them at startup.
+
+from file_utils import write_if_changed
+from site_config import SiteConfig, load_sites
+
+# Build cache (derived files that survive between builds). Everything keyed
+# by content is shared by all sites; each site's own state (page manifest,
+# search index, critical CSS, ...) lives in SITE_CACHE_DIR/<name>
+CACHE_DIR = Path('.build_cache')
+SITE_CACHE_DIR = CACHE_DIR / 'sites'
+
+# Sites built by one run (see site_config.py); DEFAULT_SITE if absent
+SITES_FILE = Path('sites.json')
+DEFAULT_SITE = SiteConfig(
+    name='njwfish',
+    source_dir=Path('njwfish'),
+    output_dir=Path('site'),
+    site_url='https://njw.fish',
+    title='Nic Fishman',
+    description='PhD student in Statistics at Harvard University',
+    author='Nic Fishman',
+    cache_dir=SITE_CACHE_DIR / 'njwfish',
+    cv_dir=Path('latex_cv'),
+)
+
+# Finished builds kept in each site's builds directory for --rollback
+# (see staged_output.py)
+BUILDS_KEPT = 5
 
 # Markdown extensions
 MD_EXTENSIONS = ['fenced_code', 'tables', 'toc']
 
+# Rendered Markdown, keyed by source text, extensions and highlighting
+MARKDOWN_CACHE_DIR = CACHE_DIR / 'markdown'
+
+# Pygments style for fenced code, and highlighted blocks keyed by language,
+# code and style (see highlight.py)
+HIGHLIGHT_STYLE = 'friendly'
+HIGHLIGHT_CACHE_DIR = CACHE_DIR / 'highlight'
+
+# Metadata derived from post sources (extracted title, blurb, word count),
+# keyed by a hash of the source so the build never writes into post folders
+POST_META_CACHE_DIR = CACHE_DIR / 'post_meta'
+
+# Reading speed behind a post's reading time
+WORDS_PER_MINUTE = 230
+
+# Compiled Jinja templates, keyed by template path and source
+TEMPLATE_CACHE_DIR = CACHE_DIR / 'jinja'
+
+# Feeds include at most this many of the newest entries
+FEED_MAX_ENTRIES = 20
+
+# Seconds the Google Scholar fetch may run before the build stops waiting
+SCHOLAR_DEADLINE = 60
+
+# Content-addressed store that published assets are hardlinked from
+ASSET_STORE_DIR = CACHE_DIR / 'assets'
+
+# Guards the read-modify-write of the shared image and PDF cache indexes
+_cache_index_lock = threading.Lock()
+
+# Per-digest locks, so concurrent site builds process a shared file once
+_digest_locks = {}
+_digest_locks_lock = threading.Lock()
+
+# Responsive image variants
+IMAGE_WIDTHS = [480, 960, 1440]
+IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.webp']
+IMAGE_QUALITY = 82
+IMAGE_SIZES = '(max-width: 900px) 100vw, 900px'
+
+# Published even when no page links to them: documents that are shared or
+# linked to directly (e.g. from the CV) rather than from the site
+KEEP_ASSETS = ['static/papers/*', 'static/slides/*', 'static/cv.pdf', 'static/resume.pdf']
+
+# File types precached by the service worker; everything else is cached on first use
+PRECACHE_EXTENSIONS = ['.html', '.css', '.js', '.woff2', '.woff']
+
+# Written by build_service_worker(); they list assets rather than use them,
+# so they never keep an asset from being pruned
+SERVICE_WORKER_FILES = ['sw.js', 'precache-manifest.json']
+
+# Per-page first-visit budgets (see page_budget.py). A site's budgets.json
+# may override these under "default" or under URL prefixes such as "/posts/"
+PAGE_BUDGETS = {
+    'default': {
+        'total_kb': 600,
+        'html_kb': 100,
+        'css_kb': 50,
+        'js_kb': 50,
+        'fonts_kb': 150,
+        'images_kb': 500,
+        'requests': 15,
+        'third_party_requests': 1,
+    },
+}
+
+# Last-commit times of every file (see git_history.py), cached per HEAD
+# commit and loaded once per run for every site
+GIT_HISTORY_FILE = CACHE_DIR / 'git_history.json'
+
+# A post counts as updated once a commit lands this long after its first
+# commit (so the commits that publish it don't count)
+POST_UPDATE_GRACE = 7 * 24 * 3600
+_git_history = None
+_git_history_lock = threading.Lock()
+
+# Critical CSS inliners by site name (see critical_css.py)
+_critical_css = {}
+_critical_css_lock = threading.Lock()
+
+# Optimized copies of published PDFs, keyed by source hash (needs pikepdf)
+PDF_CACHE_DIR = CACHE_DIR / 'pdf'
+
+# Linearized PDFs are kept even if they grow by up to this fraction
+PDF_MAX_GROWTH = 0.01
+
+# PDFs optimized by this process, for sites built in parallel
+_pdf_entries = {}
+
+# CV variants compiled from a site's cv_dir: output PDF name -> main .tex
+# file. Each is built in its own directory under the site's latex_build_dir,
+# which keeps its .aux state between builds
+CV_VARIANTS = {'cv': 'cv.tex', 'resume': 'resume.tex'}
+
+# xelatex passes are repeated until the .aux files stop changing
+LATEX_MAX_PASSES = 4
+
+# Files xelatex writes next to a main .tex when run by hand, not inputs of a compile
+LATEX_OUTPUT_SUFFIXES = {'.aux', '.log', '.out', '.toc', '.xdv', '.pdf'}
+
 def ensure_dir(path):
     """Create directory if it doesn't exist"""
     path.mkdir(parents=True, exist_ok=True)
 
+def file_hash(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def digest_lock(digest):
+    """The lock for work on one content digest in the shared caches"""
+    with _digest_locks_lock:
+        return _digest_locks.setdefault(digest, threading.Lock())
+
+def save_cache_index(index_file, index):
+    """
+    Merge entries into a shared cache index file.
+    
+    Sites built in parallel share the image and PDF caches, so the file is
+    re-read under a lock and written atomically rather than overwritten
+    with one build's view of it.
+    """
+    with _cache_index_lock:
+        merged = {}
+        if index_file.exists():
+            try:
+                merged = json.loads(index_file.read_text())
+            except ValueError:
+                merged = {}
+        merged.update(index)
+        tmp = index_file.with_name(f"{index_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(merged, indent=2, sort_keys=True))
+        os.replace(tmp, index_file)
+
 def md_to_html(md_path):
-    """Convert markdown file to HTML"""
+    """
+    Convert markdown file to HTML, highlighting fenced code with Pygments if
+    it is installed.
+    
+    Results are cached in MARKDOWN_CACHE_DIR by a hash of the text,
+    extensions and highlighting, shared by every site in the build.
+    """
     if not md_path.exists():
         return ""
+    
     with codecs.open(md_path, mode="r", encoding="utf-8") as f:
         text = f.read()
-    return markdown.markdown(text, extensions=MD_EXTENSIONS)
+    from highlight import highlight_html, pygments_version
+    
+    pygments = pygments_version()
+    highlighting = f"pygments-{pygments}-{HIGHLIGHT_STYLE}" if pygments else 'plain'
+    key = hashlib.sha256('\0'.join([text, highlighting] + MD_EXTENSIONS).encode('utf-8')).hexdigest()
+    cached = MARKDOWN_CACHE_DIR / f"{key}.html"
+    if cached.exists():
+        return cached.read_text(encoding='utf-8')
+    
+    import markdown
+    html = markdown.markdown(text, extensions=MD_EXTENSIONS)
+    if pygments:
+        html = highlight_html(html, HIGHLIGHT_STYLE, HIGHLIGHT_CACHE_DIR)
+    ensure_dir(MARKDOWN_CACHE_DIR)
+    tmp = cached.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(html, encoding='utf-8')
+    os.replace(tmp, cached)
+    return html
+
+def git_history():
+    """The checkout's GitHistory, loaded on first use"""
+    global _git_history
+    with _git_history_lock:
+        if _git_history is None:
+            from git_history import load_history
+            _git_history = load_history(GIT_HISTORY_FILE)
+        return _git_history
+
+def format_date(timestamp):
+    """A Unix time as a date in the site's format, or '' if None"""
+    return time.strftime('%B %d, %Y', time.gmtime(timestamp)) if timestamp else ''
 
-def load_post(post_dir):
-    """Load post metadata and content"""
+def derive_post_metadata(source, is_markdown, html):
+    """Title, blurb, word count and reading time derived from a post's main file"""
+    from search_index import html_to_text
+    
+    lines = source.split('\n') if is_markdown else []
+    title = None
+    for line in lines:
+        if line.strip().startswith('# '):
+            title = line.strip()[2:].strip()
+            break
+    
+    blurb = ""
+    for line in lines[:3]:  # Check first 3 lines
+        if line.strip() and not line.strip().startswith('#'):
+            blurb = line.strip()[:150] + "..." if len(line.strip()) > 150 else line.strip()
+            break
+    
+    word_count = len(html_to_text(html).split())
+    return {
+        'title': title,
+        'blurb': blurb or "No description available.",
+        'word_count': word_count,
+        'reading_time': max(1, round(word_count / WORDS_PER_MINUTE)),
+    }
+
+def post_metadata(source_file, html):
+    """
+    derive_post_metadata() for a post's main.md or main.html (None if it has
+    neither), cached in POST_META_CACHE_DIR by a hash of the file's contents.
+    """
+    if source_file is None:
+        return derive_post_metadata("", False, "")
+    
+    source = source_file.read_text(encoding='utf-8')
+    key = hashlib.sha256(f"{source_file.name}\0{WORDS_PER_MINUTE}\0{source}".encode('utf-8')).hexdigest()
+    cached = POST_META_CACHE_DIR / f"{key}.json"
+    if cached.exists():
+        return json.loads(cached.read_text(encoding='utf-8'))
+    
+    meta = derive_post_metadata(source, source_file.suffix == '.md', html)
+    ensure_dir(POST_META_CACHE_DIR)
+    tmp = cached.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(meta), encoding='utf-8')
+    os.replace(tmp, cached)
+    return meta
+
+def load_post(post_dir, history=None):
+    """
+    Load post metadata and content.
+    
+    Never writes to post_dir: a missing title or blurb file is filled in from
+    post_metadata(), which is cached outside the source tree. With a
+    GitHistory, a post whose files were committed again at least
+    POST_UPDATE_GRACE after they were first committed (and after its date)
+    gets an 'updated' date.
+    """
     post_name = post_dir.name
     
     # Read title and blurb
@@ -43,40 +293,27 @@ def load_post(post_dir):
     blurb_file = post_dir / 'blurb'
     date_file = post_dir / 'date'
     
-    title = title_file.read_text().strip() if title_file.exists() else post_name.replace('_', ' ').title()
-    blurb = blurb_file.read_text().strip() if blurb_file.exists() else ""
-    
     # Read main content
     main_html = post_dir / 'main.html'
     main_md = post_dir / 'main.md'
     
     if main_html.exists():
+        source_file = main_html
         post_content = main_html.read_text()
     elif main_md.exists():
+        source_file = main_md
         post_content = md_to_html(main_md)
-        # If no title file, try to extract from markdown
-        if not title_file.exists():
-            lines = main_md.read_text().split('\n')
-            for line in lines:
-                if line.strip().startswith('# '):
-                    title = line.strip()[2:].strip()
-                    break
-        # Ensure blurb exists - if missing, create a default from markdown
-        if not blurb:
-            lines = main_md.read_text().split('\n')
-            for line in lines[:3]:  # Check first 3 lines
-                if line.strip() and not line.strip().startswith('#'):
-                    blurb = line.strip()[:150] + "..." if len(line.strip()) > 150 else line.strip()
-                    break
-            if not blurb:
-                blurb = "No description available."
-            # Write blurb back to file
-            blurb_file.write_text(blurb)
     else:
+        source_file = None
         post_content = ""
-        if not blurb:
-            blurb = "No description available."
-            blurb_file.write_text(blurb)
+    meta = post_metadata(source_file, post_content)
+    
+    if title_file.exists():
+        title = title_file.read_text().strip()
+    else:
+        title = meta['title'] or post_name.replace('_', ' ').title()
+    blurb = blurb_file.read_text().strip() if blurb_file.exists() else ""
+    blurb = blurb or meta['blurb']
     
     # Get date from date file (required)
     if not date_file.exists():
@@ -100,25 +337,40 @@ def load_post(post_dir):
     date_sort = date_tuple
     date_str = time.strftime('%B %d, %Y', date_tuple)
     
+    # Last commit to any of the post's files, if well after the first one
+    # and later than the post's date
+    updated = None
+    if history:
+        files = [p for p in post_dir.iterdir() if p.is_file()]
+        first, last = history.oldest(files), history.newest(files)
+        if first and last - first >= POST_UPDATE_GRACE and \
+                time.strftime('%Y-%m-%d', time.gmtime(last)) > time.strftime('%Y-%m-%d', date_tuple):
+            updated = last
+    
     return {
         'slug': post_name,
         'title': title,
         'blurb': blurb,
         'content': post_content,
         'date': date_str,
-        'date_sort': date_sort
+        'date_sort': date_sort,
+        'updated': format_date(updated),
+        'updated_sort': time.gmtime(updated) if updated else date_sort,
+        'word_count': meta['word_count'],
+        'reading_time': meta['reading_time'],
     }
 
-def load_posts():
+def load_posts(site):
     """Load all posts"""
     posts = []
-    if not POSTS_DIR.exists():
+    if not site.posts_dir.exists():
         return posts
     
-    for post_dir in POSTS_DIR.iterdir():
+    history = git_history()
+    for post_dir in site.posts_dir.iterdir():
         if post_dir.is_dir():
             try:
-                post = load_post(post_dir)
+                post = load_post(post_dir, history)
                 posts.append(post)
             except Exception as e:
                 print(f"Error loading post {post_dir}: {e}")
@@ -127,44 +379,155 @@ def load_posts():
     posts.sort(key=lambda x: x['date_sort'], reverse=True)
     return posts
 
-def load_talks():
+def load_talks(site):
     """Load talks from talks.json if it exists"""
-    talks_file = SOURCE_DIR / 'talks.json'
+    talks_file = site.talks_file
     if talks_file.exists():
         with open(talks_file, 'r') as f:
             return json.load(f)
     return []
 
-def copy_static_files():
+def papers_path(site):
+    """The paper store in use: papers.jsonl if present, else papers.json"""
+    from paper_store import papers_file
+    return papers_file(site.source_dir)
+
+def load_papers(site):
+    """Load papers.json, returning (published, working) lists sorted by year"""
+    from paper_store import load_papers_data
+    from venues import classify_paper
+    
+    papers_json_file = papers_path(site)
+    published_papers = []
+    working_papers = []
+    
+    if papers_json_file.exists():
+        papers_data = load_papers_data(papers_json_file)
+        # Handle both old format (list) and new format (dict with published/working)
+        if isinstance(papers_data, dict):
+            published_papers = papers_data.get('published', [])
+            working_papers = papers_data.get('working', [])
+        else:
+            # Old format - organize on the fly
+            for paper in papers_data:
+                if classify_paper(paper) == 'published':
+                    published_papers.append(paper)
+                else:
+                    working_papers.append(paper)
+    
+    # Sort by year
+    published_papers.sort(key=lambda p: (p.get('year', '') or '0'), reverse=True)
+    working_papers.sort(key=lambda p: (p.get('year', '') or '0'), reverse=True)
+    
+    return published_papers, working_papers
+
+def new_asset_stats():
+    """Counters for the asset store build summary"""
+    return {'files': 0, 'bytes': 0, 'digests': set(), 'duplicate_files': 0, 'duplicate_bytes': 0}
+
+def store_asset(src):
+    """Add a file to the content-addressed asset store, returning (digest, object path)"""
+    digest = file_hash(src)
+    obj = ASSET_STORE_DIR / digest[:2] / digest
+    if not obj.exists():
+        ensure_dir(obj.parent)
+        tmp = obj.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.copy2(src, tmp)
+        os.replace(tmp, obj)
+    return digest, obj
+
+def publish_file(src, dst, stats=None):
+    """
+    Publish a file into the output tree via the asset store.
+    
+    Identical files are stored once and hardlinked into each output path,
+    falling back to a copy when the store and output are on different
+    filesystems.
+    """
+    digest, obj = store_asset(src)
+    ensure_dir(dst.parent)
+    
+    if stats is not None:
+        size = obj.stat().st_size
+        stats['files'] += 1
+        stats['bytes'] += size
+        if digest in stats['digests']:
+            stats['duplicate_files'] += 1
+            stats['duplicate_bytes'] += size
+        stats['digests'].add(digest)
+    
+    if dst.exists():
+        if os.path.samefile(dst, obj):
+            return
+        dst.unlink()
+    try:
+        os.link(obj, dst)
+    except OSError:
+        shutil.copy2(obj, dst)
+
+def prune_asset_store():
+    """
+    Delete asset store objects no kept build links to, returning (objects, bytes) removed.
+    
+    Every published file is a hardlink to its object (or an independent
+    copy), so an object whose link count is 1 is referenced only by the
+    store. Run it only while no build is publishing files, since a freshly
+    stored object has not been linked yet.
+    """
+    removed = freed = 0
+    if not ASSET_STORE_DIR.exists():
+        return removed, freed
+    for obj in ASSET_STORE_DIR.glob('*/*'):
+        st = obj.stat()
+        if obj.suffix == '.tmp' or st.st_nlink > 1:
+            continue
+        obj.unlink()
+        removed += 1
+        freed += st.st_size
+    for shard in ASSET_STORE_DIR.iterdir():
+        if shard.is_dir() and not any(shard.iterdir()):
+            shard.rmdir()
+    return removed, freed
+
+def publish_tree(src_dir, dst_dir, stats=None):
+    """Publish every file under src_dir into dst_dir, replacing what was there"""
+    if dst_dir.exists():
+        shutil.rmtree(dst_dir)
+    for path in sorted(src_dir.rglob('*')):
+        if path.is_file():
+            publish_file(optimized_pdf(path), dst_dir / path.relative_to(src_dir), stats)
+
+def print_asset_summary(stats):
+    """Report how much the asset store deduplicated"""
+    mb = 1024 * 1024
+    print(f"Assets: {stats['files']} files ({stats['bytes'] / mb:.1f} MB), "
+          f"{len(stats['digests'])} unique")
+    if stats['duplicate_files']:
+        print(f"  Deduplicated {stats['duplicate_files']} files, "
+              f"saving {stats['duplicate_bytes'] / mb:.1f} MB")
+
+def copy_static_files(site, stats=None):
     """Copy static files to output directory"""
-    static_output = OUTPUT_DIR / 'static'
+    static_output = site.output_dir / 'static'
     
-    # Copy CSS, JS, fonts, images
-    for item in ['css', 'js', 'fonts', 'img', 'papers', 'slides']:
-        src = STATIC_DIR / item
-        if src.exists():
-            dst = static_output / item
-            if dst.exists():
-                shutil.rmtree(dst)
-            shutil.copytree(src, dst)
-    
-    # Copy PDFs
-    for pdf in ['resume.pdf', 'cv.pdf']:
-        src = STATIC_DIR / pdf
+    # Copy CSS, JS, images (web fonts are published by build_web_fonts)
+    for item in ['css', 'js', 'img', 'papers', 'slides']:
+        src = site.static_dir / item
         if src.exists():
-            ensure_dir(static_output)
-            shutil.copy2(src, static_output / pdf)
+            publish_tree(src, static_output / item, stats)
+    
+    # The CV PDFs are published by publish_cv once the cv stage has compiled them
     
     # Copy favicon to root for better browser compatibility
-    favicon_src = STATIC_DIR / 'img' / 'favicon.ico'
+    favicon_src = site.static_dir / 'img' / 'favicon.ico'
     if favicon_src.exists():
-        shutil.copy2(favicon_src, OUTPUT_DIR / 'favicon.ico')
+        publish_file(favicon_src, site.output_dir / 'favicon.ico', stats)
     
     # Copy post assets (PDFs, images, etc. from post directories)
-    posts_static = OUTPUT_DIR / 'static' / 'posts'
+    posts_static = site.output_dir / 'static' / 'posts'
     ensure_dir(posts_static)
-    if POSTS_DIR.exists():
-        for post_dir in POSTS_DIR.iterdir():
+    if site.posts_dir.exists():
+        for post_dir in site.posts_dir.iterdir():
             if post_dir.is_dir():
                 # Copy all non-content files from post directories
                 post_name = post_dir.name
@@ -172,157 +535,788 @@ def copy_static_files():
                 ensure_dir(post_output)
                 for item in post_dir.iterdir():
                     if item.is_file() and item.name not in ['title', 'blurb', 'main.md', 'main.html']:
-                        shutil.copy2(item, post_output / item.name)
+                        publish_file(optimized_pdf(item), post_output / item.name, stats)
+    
+    return stats
 
-def build_cv():
-    """Generate CV publications section and compile PDF"""
-    import subprocess
+def find_source_images(site):
+    """Find raster images under static/img and post directories, keyed by site URL"""
+    images = {}
+    img_dir = site.static_dir / 'img'
+    if img_dir.exists():
+        for path in sorted(img_dir.rglob('*')):
+            if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS:
+                images['/static/' + path.relative_to(site.static_dir).as_posix()] = path
+    if site.posts_dir.exists():
+        for post_dir in sorted(site.posts_dir.iterdir()):
+            if post_dir.is_dir():
+                for path in sorted(post_dir.iterdir()):
+                    if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS:
+                        images[f'/static/posts/{post_dir.name}/{path.name}'] = path
+    return images
+
+def build_image_variants(site, stats=None):
+    """
+    Generate resized, recompressed variants of every source image.
     
-    print("Generating CV publications section...")
+    Variants are cached in CACHE_DIR/images by source hash and width, so
+    Pillow only runs for images that are new or have changed. Returns a map
+    from image URL to a list of (url, width) candidates for srcset.
+    """
+    images = find_source_images(site)
+    if not images:
+        return {}
     
-    # Generate writing.tex from papers.json
-    papers_json = SOURCE_DIR / 'papers.json'
-    writing_tex = Path('latex_cv') / 'resume' / 'writing.tex'
+    cache_dir = CACHE_DIR / 'images'
+    ensure_dir(cache_dir)
+    index_file = cache_dir / 'index.json'
+    index = {}
+    if index_file.exists():
+        try:
+            index = json.loads(index_file.read_text())
+        except ValueError:
+            index = {}
     
-    if papers_json.exists():
-        subprocess.run([
-            'python3', 'generate_cv_papers.py',
-            str(papers_json),
-            str(writing_tex)
-        ], check=False)
+    variants = {}
+    encoded = 0
+    for url, src in images.items():
+        digest = file_hash(src)
+        ext = src.suffix.lower()
+        entry = index.get(digest)
+        missing = entry is None or any(
+            not (cache_dir / f"{digest}-{w}{ext}").exists() for w in entry['widths']
+        )
+        
+        if missing:
+            try:
+                from PIL import Image
+            except ImportError:
+                print("Warning: Pillow not installed. Skipping responsive images.")
+                return {}
+            # Sites built in parallel share the variants; each is written to a
+            # temp file and renamed, so a variant that exists is always complete
+            with digest_lock(digest):
+                try:
+                    with Image.open(src) as img:
+                        width, height = img.size
+                        widths = [w for w in IMAGE_WIDTHS if w < width]
+                        for w in widths:
+                            out = cache_dir / f"{digest}-{w}{ext}"
+                            if out.exists():
+                                continue
+                            tmp = out.with_name(f"{out.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                            image_format = Image.registered_extensions()[ext]
+                            resized = img.resize((w, max(1, round(height * w / width))), Image.LANCZOS)
+                            if ext in ('.jpg', '.jpeg'):
+                                resized.convert('RGB').save(tmp, image_format, quality=IMAGE_QUALITY, optimize=True, progressive=True)
+                            elif ext == '.webp':
+                                resized.save(tmp, image_format, quality=IMAGE_QUALITY, method=6)
+                            else:
+                                resized.save(tmp, image_format, optimize=True)
+                            os.replace(tmp, out)
+                            encoded += 1
+                except Exception as e:
+                    print(f"Warning: Could not resize {src}: {e}")
+                    continue
+            entry = {'width': width, 'widths': widths}
+            index[digest] = entry
+        
+        if not entry['widths']:
+            continue
+        
+        # Copy cached variants next to the original in the output tree
+        stem, _ = url.rsplit('.', 1)
+        candidates = []
+        for w in entry['widths']:
+            variant_url = f"{stem}-{w}w{ext}"
+            dst = site.output_dir / variant_url.lstrip('/')
+            publish_file(cache_dir / f"{digest}-{w}{ext}", dst, stats)
+            candidates.append((variant_url, w))
+        candidates.append((url, entry['width']))
+        variants[url] = candidates
     
-    # Compile CV PDF
-    print("Compiling CV PDF...")
-    cv_dir = Path('latex_cv')
-    cv_tex = cv_dir / 'cv.tex'
+    save_cache_index(index_file, index)
+    print(f"Responsive images: {len(variants)} images, {encoded} variants encoded")
+    return variants
+
+def pdf_stream_key(stream):
+    """Hash of a PDF stream's data and dictionary, for spotting duplicates"""
+    h = hashlib.sha256(stream.read_raw_bytes())
+    for key in sorted(stream.keys()):
+        if key == '/Length':
+            continue
+        value = stream[key]
+        # Indirect values (e.g. an image's /SMask) are compared by identity
+        indirect = getattr(value, 'is_indirect', False)
+        h.update(f"{key}={value.objgen if indirect else repr(value)};".encode('utf-8'))
+    return h.hexdigest()
+
+def dedupe_pdf_resources(pdf):
+    """
+    Point every page at one copy of each identical image and embedded font.
+    
+    Copies that are no longer referenced are dropped when the PDF is saved.
+    Returns the number of references that were redirected.
+    """
+    seen = {}
+    redirected = 0
+    
+    def canonical(stream):
+        nonlocal redirected
+        first = seen.setdefault(pdf_stream_key(stream), stream)
+        if first.objgen != stream.objgen:
+            redirected += 1
+        return first
     
-    if cv_tex.exists():
+    for page in pdf.pages:
+        resources = page.obj.get('/Resources')
+        if resources is None:
+            continue
+        xobjects = resources.get('/XObject')
+        if xobjects is not None:
+            for name in list(xobjects.keys()):
+                xobj = xobjects[name]
+                if getattr(xobj, 'is_indirect', False) and xobj.get('/Subtype') == '/Image':
+                    xobjects[name] = canonical(xobj)
+        fonts = resources.get('/Font')
+        if fonts is not None:
+            for name in list(fonts.keys()):
+                font = fonts[name]
+                # Composite fonts keep their descriptor on the descendant font
+                for f in [font] + list(font.get('/DescendantFonts', [])):
+                    descriptor = f.get('/FontDescriptor')
+                    if descriptor is None:
+                        continue
+                    for key in ('/FontFile', '/FontFile2', '/FontFile3'):
+                        if key in descriptor and getattr(descriptor[key], 'is_indirect', False):
+                            descriptor[key] = canonical(descriptor[key])
+    return redirected
+
+def optimized_pdf(src):
+    """
+    The cached optimized copy of src if it is a PDF that has one, else src.
+    
+    Publishing the copy directly keeps the raw PDF out of the asset store;
+    optimize_pdfs() then finds the published file already optimized.
+    """
+    if src.suffix.lower() != '.pdf':
+        return src
+    digest = file_hash(src)
+    entry = _pdf_entries.get(digest)
+    if entry is None:
         try:
-            # Change to latex_cv directory for compilation
-            subprocess.run(
-                ['xelatex', '-interaction=nonstopmode', 'cv.tex'],
-                cwd=str(cv_dir),
-                capture_output=True,
-                text=True
-            )
-            
-            # Run twice for references
-            subprocess.run(
-                ['xelatex', '-interaction=nonstopmode', 'cv.tex'],
-                cwd=str(cv_dir),
-                capture_output=True,
-                text=True
-            )
-            
-            # Copy PDF to static directory
-            cv_pdf = cv_dir / 'cv.pdf'
-            if cv_pdf.exists():
-                shutil.copy2(cv_pdf, STATIC_DIR / 'cv.pdf')
-                print("CV PDF compiled successfully!")
+            entry = json.loads((PDF_CACHE_DIR / 'index.json').read_text()).get(digest)
+        except (OSError, ValueError):
+            entry = None
+    cached = PDF_CACHE_DIR / f"{digest}.pdf"
+    return cached if entry and entry['optimized'] and cached.exists() else src
+
+def optimize_pdfs(site, paths=None):
+    """
+    Rewrite published PDFs for the web.
+    
+    Each PDF is saved with compressed object streams, deduplicated images and
+    fonts, and linearization (so viewers can show the first page before the
+    download finishes). Results are cached in PDF_CACHE_DIR by source hash;
+    a PDF that would grow by more than PDF_MAX_GROWTH is left as it is.
+    Each optimized copy is also recorded as needing no optimization, so a
+    PDF published from the cache by optimized_pdf() is left alone.
+    `paths` defaults to every PDF under the output static directory.
+    """
+    if paths is None:
+        paths = sorted((site.output_dir / 'static').rglob('*.pdf'))
+    paths = [p for p in paths if p.exists()]
+    if not paths:
+        return
+    
+    ensure_dir(PDF_CACHE_DIR)
+    index_file = PDF_CACHE_DIR / 'index.json'
+    index = {}
+    if index_file.exists():
+        try:
+            index = json.loads(index_file.read_text())
+        except ValueError:
+            index = {}
+    
+    optimized = 0
+    before = after = 0
+    for path in paths:
+        digest = file_hash(path)
+        cached = PDF_CACHE_DIR / f"{digest}.pdf"
+        # Sites built in parallel publish the same PDFs; optimize each once
+        with digest_lock(digest):
+            entry = index.get(digest) or _pdf_entries.get(digest)
+            if entry is None or (entry['optimized'] and not cached.exists()):
+                try:
+                    import pikepdf
+                except ImportError:
+                    print("Warning: pikepdf not installed. Skipping PDF optimization.")
+                    return
+                tmp = cached.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+                try:
+                    with pikepdf.open(path) as pdf:
+                        dedupe_pdf_resources(pdf)
+                        pdf.remove_unreferenced_resources()
+                        pdf.save(
+                            tmp,
+                            linearize=True,
+                            compress_streams=True,
+                            recompress_flate=True,
+                            object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                        )
+                except Exception as e:
+                    print(f"Warning: Could not optimize {path}: {e}")
+                    continue
+                size = path.stat().st_size
+                entry = {'before': size, 'after': tmp.stat().st_size, 'optimized': True}
+                if entry['after'] <= size * (1 + PDF_MAX_GROWTH):
+                    os.replace(tmp, cached)
+                    output = file_hash(cached)
+                    _pdf_entries[output] = index[output] = dict(entry, optimized=False)
+                else:
+                    entry = {'before': size, 'after': size, 'optimized': False}
+                    tmp.unlink()
+                _pdf_entries[digest] = entry
+                optimized += 1
+            index[digest] = entry
+        
+        before += entry['before']
+        after += entry['after']
+        if entry['optimized']:
+            publish_file(cached, path)
+    
+    save_cache_index(index_file, index)
+    mb = 1024 * 1024
+    print(f"PDFs: {len(paths)} files, {before / mb:.1f} MB -> {after / mb:.1f} MB "
+          f"({optimized} optimized this build)")
+
+def build_web_fonts(site):
+    """
+    Publish the web fonts main.css uses, subsetted to the site's text.
+    
+    Only @font-face rules whose family, weight and style the stylesheet can
+    actually render are kept. Each of those fonts is subset to the characters
+    on the rendered pages and converted to WOFF2 (cached in CACHE_DIR/fonts
+    by font and glyph-set hash), and the published main.css is rewritten to
+    point at the subsets. Without fontTools the original font files are
+    published instead.
+    """
+    import webfonts
+    from search_index import html_to_text
+    
+    css_src = site.static_dir / 'css' / 'main.css'
+    fonts_output = site.output_dir / 'static' / 'fonts'
+    if fonts_output.exists():
+        shutil.rmtree(fonts_output)
+    if not css_src.exists():
+        return
+    
+    css = css_src.read_text(encoding='utf-8')
+    faces = webfonts.parse_font_faces(css)
+    if not faces:
+        print("Web fonts: main.css declares no @font-face rules, no fonts published")
+        return
+    
+    pages = [p.read_text(encoding='utf-8') for p in sorted(site.output_dir.rglob('*.html'))]
+    used = webfonts.used_faces(css, pages)
+    chars = webfonts.glyph_set(html_to_text(page) for page in pages)
+    
+    # Unused rules are dropped; used ones are replaced as their fonts are published
+    replacements = {face['span']: '' for face in faces}
+    before = after = 0
+    unsubset = 0
+    for face in used:
+        src = None
+        for url in face['urls']:
+            if url.startswith('/static/'):
+                candidate = site.static_dir / url[len('/static/'):]
             else:
-                print(f"Warning: CV PDF not found at {cv_pdf}")
-                # Try alternative location
-                alt_pdf = Path('latex_cv') / 'cv.pdf'
-                if alt_pdf.exists():
-                    shutil.copy2(alt_pdf, STATIC_DIR / 'cv.pdf')
-                    print("CV PDF found and copied from alternative location!")
+                candidate = css_src.parent / url
+            if candidate.exists():
+                src = Path(os.path.normpath(candidate))
+                break
+        if src is None:
+            print(f"Warning: No font file found for {face['family']} {face['weight']} {face['style']}")
+            del replacements[face['span']]
+            continue
+        
+        subset = webfonts.subset_font(src, chars, CACHE_DIR / 'fonts')
+        before += src.stat().st_size
+        if subset is None:
+            # No fontTools: publish the font as-is and keep its rule
+            publish_file(src, site.output_dir / 'static' / src.relative_to(site.static_dir))
+            after += src.stat().st_size
+            unsubset += 1
+            del replacements[face['span']]
+            continue
+        publish_file(subset, fonts_output / subset.name)
+        after += subset.stat().st_size
+        replacements[face['span']] = webfonts.font_face_rule(face, f"/static/fonts/{subset.name}")
+    
+    write_if_changed(site.output_dir / 'static' / 'css' / 'main.css', webfonts.rewrite_css(css, replacements))
+    if unsubset:
+        print("Warning: fontTools not installed. Publishing web fonts without subsetting.")
+    print(f"Web fonts: {len(used)} of {len(faces)} faces used, "
+          f"{before / 1024:.0f} KB -> {after / 1024:.0f} KB")
+
+def prune_static_assets(site):
+    """
+    Remove published static assets that nothing links to.
+    
+    References are followed from every page, feed and other file outside
+    the output's static/ (plus the generated search index, files matching
+    KEEP_ASSETS and the JSON data files in the site's source directory)
+    through HTML, CSS, JS and JSON; SERVICE_WORKER_FILES are skipped, as a
+    previous precache list must not keep its own entries alive. Static files
+    that are never reached are deleted from the output, and references that
+    point at missing files are reported. Returns (dropped paths, broken
+    references).
+    """
+    from asset_graph import reachable_files
+    
+    static_output = site.output_dir / 'static'
+    generated = [static_output / 'search']
+    roots = []
+    candidates = []
+    for path in sorted(site.output_dir.rglob('*')):
+        if not path.is_file():
+            continue
+        if path.parent == site.output_dir and path.name in SERVICE_WORKER_FILES:
+            continue
+        keep = any(path.relative_to(site.output_dir).match(pattern) for pattern in KEEP_ASSETS)
+        if static_output in path.parents and not keep and not any(g in path.parents for g in generated):
+            candidates.append(path)
+        else:
+            roots.append(path)
+    data_files = {
+        path: '/' for path in sorted(site.source_dir.iterdir()) if path.suffix in ('.json', '.jsonl')
+    }
+    
+    reachable, broken = reachable_files(site.output_dir, roots, site.site_url, data_files)
+    
+    dropped = [path for path in candidates if path not in reachable]
+    dropped_bytes = 0
+    for path in dropped:
+        dropped_bytes += path.stat().st_size
+        path.unlink()
+    for directory in sorted({p.parent for p in dropped}, key=lambda d: -len(d.parts)):
+        while directory != static_output and directory.exists() and not any(directory.iterdir()):
+            directory.rmdir()
+            directory = directory.parent
+    
+    print(f"Assets: {len(candidates) - len(dropped)} of {len(candidates)} static files referenced, "
+          f"dropped {len(dropped)} ({dropped_bytes / (1024 * 1024):.1f} MB)")
+    for path in dropped:
+        print(f"  dropped {path.relative_to(site.output_dir)}")
+    for source, ref in broken:
+        print(f"Warning: Broken reference in {source}: {ref}")
+    return dropped, broken
+
+def build_service_worker(site, env):
+    """
+    Write sw.js and precache-manifest.json from the finished output tree.
+    
+    The manifest maps the URL of every page, and every stylesheet, script
+    and font the pages reach, to a hash of its contents, so it can never
+    list a file the build didn't produce or no page uses, and the service
+    worker only re-downloads entries whose hash changed.
+    """
+    from asset_graph import reachable_files
+    
+    pages = sorted(site.output_dir.rglob('*.html'))
+    reachable, _ = reachable_files(site.output_dir, pages, site.site_url)
+    manifest = {}
+    for path in sorted(reachable):
+        if path.suffix.lower() not in PRECACHE_EXTENSIONS:
+            continue
+        if path.parent == site.output_dir and path.name in SERVICE_WORKER_FILES:
+            continue
+        url = '/' + path.relative_to(site.output_dir).as_posix()
+        if path.name == 'index.html':
+            url = url[:-len('index.html')]
+        manifest[url] = file_hash(path)[:16]
+    
+    write_if_changed(site.output_dir / 'precache-manifest.json', json.dumps(manifest, indent=2) + '\n')
+    write_if_changed(site.output_dir / 'sw.js', env.get_template('sw.js').render(manifest=manifest))
+    print(f"Service worker: {len(manifest)} precached files")
+
+def check_page_budgets(site):
+    """
+    Measure every page's first-visit weight and check it against its budget.
+    
+    Writes a JSON report to the site's budget report file and returns True
+    if every page is within budget. Third-party resources (e.g. the MathJax CDN) are
+    counted as requests; their size can't be known at build time.
+    """
+    from page_budget import budget_for, check_budget, measure_page
+    
+    budgets = {k: dict(v) for k, v in PAGE_BUDGETS.items()}
+    if site.budgets_file.exists():
+        try:
+            for key, limits in json.loads(site.budgets_file.read_text()).items():
+                budgets.setdefault(key, {}).update(limits)
+        except ValueError as e:
+            print(f"Warning: Could not read {site.budgets_file}: {e}")
+    
+    report = {'pages': {}, 'violations': 0}
+    for page in sorted(site.output_dir.rglob('*.html')):
+        url = '/' + page.relative_to(site.output_dir).as_posix()
+        if page.name == 'index.html':
+            url = url[:-len('index.html')]
+        measured = measure_page(site.output_dir, page, site.site_url)
+        budget = budget_for(url, budgets)
+        violations = check_budget(measured, budget)
+        report['pages'][url] = dict(measured, budget=budget, violations=violations)
+        report['violations'] += len(violations)
+    
+    ensure_dir(site.budget_report_file.parent)
+    site.budget_report_file.write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
+    
+    pages = report['pages']
+    heaviest = max(pages, key=lambda u: pages[u]['total'], default=None)
+    if heaviest:
+        print(f"Page weight: {len(pages)} pages, heaviest {heaviest} "
+              f"({pages[heaviest]['total'] / 1024:.0f} KB, {pages[heaviest]['requests']} requests); "
+              f"report in {site.budget_report_file}")
+    for url, page in pages.items():
+        for violation in page['violations']:
+            print(f"  Over budget: {url}: {violation}")
+    return report['violations'] == 0
+
+IMG_TAG_RE = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+IMG_SRC_RE = re.compile(r'\ssrc=(["\'])(.*?)\1', re.IGNORECASE)
+
+def add_srcset(html, image_variants):
+    """Add srcset/sizes to <img> tags that point at images with variants"""
+    if not image_variants:
+        return html
+    
+    def rewrite(match):
+        tag = match.group(0)
+        if 'srcset=' in tag.lower():
+            return tag
+        src = IMG_SRC_RE.search(tag)
+        if not src or src.group(2) not in image_variants:
+            return tag
+        srcset = ', '.join(f"{url} {w}w" for url, w in image_variants[src.group(2)])
+        end = -2 if tag.endswith('/>') else -1
+        return f'{tag[:end].rstrip()} srcset="{srcset}" sizes="{IMAGE_SIZES}"{tag[end:]}'
+    
+    return IMG_TAG_RE.sub(rewrite, html)
+
+def page_url(site, path):
+    """Canonical public URL for an output file"""
+    rel = path.relative_to(site.output_dir).as_posix()
+    if rel == 'index.html':
+        rel = ''
+    elif rel.endswith('/index.html'):
+        rel = rel[:-len('index.html')]
+    return f"{site.site_url}/{rel}"
+
+def load_manifest(site):
+    """Load the previous build's page manifest and start a new one"""
+    previous = {}
+    if site.manifest_file.exists():
+        try:
+            previous = json.loads(site.manifest_file.read_text()).get('pages', {})
+        except ValueError:
+            previous = {}
+    return {'previous': previous, 'pages': {}}
+
+def record_page(site, manifest, path, html, sources=()):
+    """
+    Record a page's content hash and lastmod time in the manifest.
+    
+    An unchanged page keeps its previous lastmod. A changed page takes the
+    newest last-commit time among its sources (the mtime for files git
+    doesn't know), or the current time if the sources are no newer than the
+    last recorded change.
+    """
+    url = page_url(site, path)
+    digest = hashlib.sha256(html.encode('utf-8')).hexdigest()
+    previous = manifest['previous'].get(url)
+    if previous and previous['hash'] == digest:
+        lastmod = previous['lastmod']
+    else:
+        history = git_history()
+        times = [history.last_modified(p) or p.stat().st_mtime for p in sources if p.exists()]
+        lastmod = max(times) if times else time.time()
+        if previous and lastmod <= previous['lastmod']:
+            lastmod = time.time()
+    manifest['pages'][url] = {'hash': digest, 'lastmod': lastmod}
+
+def save_manifest(site, manifest):
+    """Persist the page manifest for the next build"""
+    ensure_dir(site.manifest_file.parent)
+    site.manifest_file.write_text(json.dumps({'pages': manifest['pages']}, indent=2, sort_keys=True))
+
+def get_critical_css(site):
+    """The site's critical-CSS inliner for main.css, created on first use"""
+    with _critical_css_lock:
+        if site.name not in _critical_css:
+            from critical_css import CriticalCSS
+            _critical_css[site.name] = CriticalCSS(site.static_dir / 'css' / 'main.css', '/static/css/main.css',
+                                                   site.critical_css_cache_file)
+        return _critical_css[site.name]
+
+def write_page(site, path, html, image_variants=None, manifest=None, sources=()):
+    """
+    Write a rendered HTML page, rewriting images to responsive variants and
+    inlining the page's critical CSS
+    """
+    html = add_srcset(html, image_variants)
+    html = get_critical_css(site).inline(html)
+    if manifest is not None:
+        record_page(site, manifest, path, html, sources)
+    write_if_changed(path, html)
+
+def build_sitemap(site, manifest):
+    """Write sitemap.xml and robots.txt from the page manifest"""
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for url, page in sorted(manifest['pages'].items()):
+        lastmod = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(page['lastmod']))
+        lines.append(f"  <url><loc>{url}</loc><lastmod>{lastmod}</lastmod></url>")
+    lines.append('</urlset>')
+    write_if_changed(site.output_dir / 'sitemap.xml', '\n'.join(lines) + '\n')
+    write_if_changed(site.output_dir / 'robots.txt', f"User-agent: *\nAllow: /\n\nSitemap: {site.site_url}/sitemap.xml\n")
+
+def build_feeds(site, posts, papers):
+    """Write Atom and JSON feeds for posts and papers"""
+    import feeds
+    
+    families = [
+        ('posts', f"Posts - {site.title}", feeds.post_entries(posts, site.site_url, FEED_MAX_ENTRIES)),
+        ('papers', f"Papers - {site.title}", feeds.paper_entries(papers, site.site_url, FEED_MAX_ENTRIES)),
+    ]
+    for section, title, entries in families:
+        page_url = f"{site.site_url}/{section}/"
+        outputs = [
+            ('feed.xml', feeds.atom_feed),
+            ('feed.json', feeds.json_feed),
+        ]
+        for filename, render in outputs:
+            feed_url = f"{site.site_url}/{section}/{filename}"
+            path = site.output_dir / section / filename
+            write_if_changed(path, render(title, site.site_url, feed_url, page_url, entries, site.author))
+
+def latex_inputs_digest(site, tex):
+    """
+    Hash of every file xelatex may read: those under the CV directory (the
+    main files, the class, fonts and images) and the generated sections.
+    Section templates (covered by the sections generated from them) and the
+    outputs of a compile run by hand in the CV directory are left out.
+    """
+    h = hashlib.sha256()
+    h.update(tex.encode('utf-8'))
+    outputs = {Path(t).stem for t in CV_VARIANTS.values()}
+    templates = site.cv_templates_dir.resolve()
+    for root in (site.cv_dir, site.cv_sections_dir):
+        for path in sorted(p for p in root.rglob('*') if p.is_file()):
+            if templates in path.resolve().parents:
+                continue
+            if path.suffix in LATEX_OUTPUT_SUFFIXES and (path.suffix != '.pdf' or path.stem in outputs):
+                continue
+            h.update(f"{root.name}/{path.relative_to(root).as_posix()}".encode('utf-8') + b'\0')
+            h.update(hashlib.sha256(path.read_bytes()).digest())
+    return h.hexdigest()
+
+def aux_state(build_dir):
+    """Contents of the auxiliary files xelatex reads back on the next pass"""
+    return {p.name: p.read_bytes() for p in sorted(build_dir.iterdir())
+            if p.suffix in ('.aux', '.out', '.toc')}
+
+def compile_cv_variant(site, name, tex):
+    """
+    Compile one CV variant in its own build directory.
+    
+    Returns (pdf path or None, number of xelatex passes run). Skipped
+    entirely when the inputs hash matches the last successful compile.
+    """
+    build_dir = site.latex_build_dir / name
+    ensure_dir(build_dir)
+    pdf = build_dir / f"{Path(tex).stem}.pdf"
+    digest_file = build_dir / 'inputs.sha256'
+    digest = latex_inputs_digest(site, tex)
+    if pdf.exists() and digest_file.exists() and digest_file.read_text() == digest:
+        return pdf, 0
+    
+    # A stale PDF must not be mistaken for this compile's output
+    if pdf.exists():
+        pdf.unlink()
+    passes = 0
+    while passes < LATEX_MAX_PASSES:
+        before = aux_state(build_dir)
+        # Run from latex_cv/ so \fontdir paths resolve; the generated
+        # sections are searched before it, ahead of any copies in latex_cv/resume/
+        subprocess.run(
+            ['xelatex', '-interaction=nonstopmode', f"-output-directory={build_dir.resolve()}", tex],
+            cwd=str(site.cv_dir),
+            env=dict(os.environ, TEXINPUTS=f"{site.cv_sections_dir.resolve()}{os.pathsep}{os.environ.get('TEXINPUTS', '')}"),
+            capture_output=True,
+            text=True
+        )
+        passes += 1
+        if aux_state(build_dir) == before:
+            break
+    
+    if not pdf.exists():
+        return None, passes
+    digest_file.write_text(digest)
+    return pdf, passes
+
+def build_cv(site):
+    """Generate the CV sections and compile every CV variant concurrently"""
+    from concurrent.futures import ThreadPoolExecutor
+    from generate_cv import SECTIONS, generate_cv_sections
+    
+    if site.cv_dir is None:
+        return
+    print("Generating CV sections...")
+    changed = generate_cv_sections(papers_path(site), site.cv_sections_dir / 'resume', source_dir=site.source_dir,
+                                   templates_dir=site.cv_templates_dir, author=site.author)
+    print(f"  {len(changed)} of {len(SECTIONS)} CV sections changed")
+    
+    variants = {name: tex for name, tex in CV_VARIANTS.items() if (site.cv_dir / tex).exists()}
+    for name in CV_VARIANTS.keys() - variants.keys():
+        print(f"Warning: CV LaTeX file not found: {site.cv_dir / CV_VARIANTS[name]}")
+    if not variants:
+        return
+    
+    print(f"Compiling CV PDFs ({', '.join(variants)})...")
+    with ThreadPoolExecutor(max_workers=len(variants)) as pool:
+        futures = {name: pool.submit(compile_cv_variant, site, name, tex) for name, tex in variants.items()}
+    for name, future in futures.items():
+        try:
+            pdf, passes = future.result()
         except FileNotFoundError:
             print("Warning: xelatex not found. Skipping CV compilation.")
+            return
         except Exception as e:
-            print(f"Warning: CV compilation failed: {e}")
-    else:
-        print("Warning: CV LaTeX file not found")
+            print(f"Warning: {name} compilation failed: {e}")
+            continue
+        if pdf is None:
+            print(f"Warning: {name} PDF not produced, see {site.latex_build_dir / name}")
+            continue
+        # Copy PDF to static directory (only when it differs, to keep mtimes stable)
+        target = site.static_dir / f"{name}.pdf"
+        if not target.exists() or target.read_bytes() != pdf.read_bytes():
+            shutil.copy2(pdf, target)
+        if passes:
+            print(f"  {name}.pdf compiled in {passes} xelatex pass{'es' if passes > 1 else ''}")
+        else:
+            print(f"  {name}.pdf is up to date")
+
+def merge_partial_papers(site):
+    """Merge publications from an interrupted Scholar fetch into papers.json"""
+    import fetch_scholar
+    
+    partial = fetch_scholar.load_partial_publications(site.scholar_partial_file)
+    if not partial:
+        print("  No publications were fetched before the deadline")
+        return
+    papers_json = papers_path(site)
+    existing = fetch_scholar.load_existing_papers(papers_json)
+    merged = fetch_scholar.merge_partial_papers(existing, partial)
+    print(f"  Merging {len(partial)} fetched publications into {len(existing)} existing papers")
+    profiles = fetch_scholar.load_profiles(site.scholar_profiles_file)
+    fetch_scholar.update_papers_config(merged, papers_json, [p['name'] for p in profiles])
 
-def fetch_papers():
-    """Fetch papers from Google Scholar and update papers.json"""
+def fetch_papers(site, deadline=SCHOLAR_DEADLINE):
+    """
+    Fetch papers from Google Scholar and update papers.json.
+    
+    The fetch is stopped once `deadline` seconds have passed; publications
+    filled before then are merged into the existing papers.json rather than
+    thrown away. Returns True if papers.json changed.
+    """
     print("Fetching papers from Google Scholar...")
     fetch_script = Path('fetch_scholar.py')
+    papers_json = papers_path(site)
+    before = papers_json.read_bytes() if papers_json.exists() else None
     
     if fetch_script.exists():
+        # A partial file left by an earlier fetch must not be merged into this one's results
+        if site.scholar_partial_file.exists():
+            site.scholar_partial_file.unlink()
         try:
-            result = subprocess.run(
-                ['python3', str(fetch_script)],
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout
+            proc = subprocess.Popen(
+                ['python3', str(fetch_script), '--partial', str(site.scholar_partial_file),
+                 '--source', str(site.source_dir), '--profiles', str(site.scholar_profiles_file)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
             )
-            if result.returncode == 0:
-                print("Papers fetched successfully from Google Scholar")
-            else:
-                print(f"Warning: Google Scholar fetch had issues: {result.stderr[:200]}")
-        except subprocess.TimeoutExpired:
-            print("Warning: Google Scholar fetch timed out")
+            try:
+                _, stderr = proc.communicate(timeout=deadline)
+                if proc.returncode == 0:
+                    print("Papers fetched successfully from Google Scholar")
+                else:
+                    print(f"Warning: Google Scholar fetch had issues: {stderr[:200]}")
+                    merge_partial_papers(site)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.communicate()
+                print(f"Warning: Google Scholar fetch passed its {deadline}s deadline, keeping partial results")
+                merge_partial_papers(site)
         except Exception as e:
             print(f"Warning: Failed to fetch papers: {e}")
     else:
         print("Warning: fetch_scholar.py not found. Skipping paper fetch.")
-
-def build_site():
-    """Build the entire static site"""
-    print("Building static site...")
-    
-    # Setup
-    ensure_dir(OUTPUT_DIR)
-    
-    # Fetch papers from Google Scholar first
-    fetch_papers()
-    
-    # Build CV first (updates publications section)
-    build_cv()
-    
-    # Load data
-    try:
-        posts = load_posts()
-    except Exception as e:
-        print(f"Error loading posts: {e}")
-        import traceback
-        traceback.print_exc()
-        raise
     
-    talks = load_talks()
+    after = papers_json.read_bytes() if papers_json.exists() else None
+    return after != before
+
+def publish_cv(site):
+    """Publish the compiled CV PDFs into the output tree, returning their paths"""
+    published = []
+    for name in CV_VARIANTS:
+        pdf = site.static_dir / f"{name}.pdf"
+        if pdf.exists():
+            publish_file(optimized_pdf(pdf), site.output_dir / 'static' / pdf.name)
+            published.append(site.output_dir / 'static' / pdf.name)
+    return published
+
+def build_index_page(site, env, image_variants, manifest):
+    """Render the index/about page"""
+    print("Building index page...")
+    about_md = site.static_dir / 'about.md'
+    about_content = md_to_html(about_md) if about_md.exists() else ""
     
-    # Setup Jinja2 environment
-    env = Environment(
-        loader=FileSystemLoader(str(TEMPLATES_DIR)),
-        autoescape=select_autoescape(['html', 'xml'])
+    about_template = env.get_template('about.html')
+    index_html = about_template.render(
+        active_page='index',
+        title=site.title,
+        description=site.description,
+        canonical_url=f"{site.site_url}/",
+        content=about_content
     )
+    index_path = site.output_dir / 'index.html'
+    write_page(site, index_path, index_html, image_variants, manifest,
+               [about_md, site.templates_dir / 'base.html', site.templates_dir / 'about.html'])
+    print(f"✓ Created {index_path}")
+
+def build_post_pages(site, env, posts, image_variants, manifest):
+    """Render the posts listing and every individual post"""
+    from highlight import has_highlighting
     
-    # Copy static files
-    copy_static_files()
-    
-    # Build index/about page
-    print("Building index page...")
-    try:
-        about_md = STATIC_DIR / 'about.md'
-        about_content = md_to_html(about_md) if about_md.exists() else ""
-        
-        about_template = env.get_template('about.html')
-        index_html = about_template.render(
-            active_page='index',
-            title='Nic Fishman',
-            description='PhD student in Statistics at Harvard University',
-            content=about_content
-        )
-        index_path = OUTPUT_DIR / 'index.html'
-        index_path.write_text(index_html)
-        print(f"✓ Created {index_path}")
-    except Exception as e:
-        print(f"Error building index page: {e}")
-        import traceback
-        traceback.print_exc()
-        raise
+    base_template = site.templates_dir / 'base.html'
     
     # Build posts listing page
     print("Building posts page...")
     posts_template = env.get_template('posts.html')
     posts_html = posts_template.render(
         active_page='words',
-        title='Posts - Nic Fishman',
+        title=f"Posts - {site.title}",
         description='Blog posts and writings',
+        canonical_url=f"{site.site_url}/posts/",
         posts=posts
     )
-    ensure_dir(OUTPUT_DIR / 'posts')
-    (OUTPUT_DIR / 'posts' / 'index.html').write_text(posts_html)
+    post_sources = [f for post in posts for f in (site.posts_dir / post['slug']).iterdir()]
+    write_page(site, site.output_dir / 'posts' / 'index.html', posts_html, image_variants, manifest,
+               post_sources + [base_template, site.templates_dir / 'posts.html'])
     
     # Build individual post pages
     print("Building post pages...")
@@ -330,80 +1324,294 @@ def build_site():
     for post in posts:
         post_html = post_template.render(
             active_page='words',
-            title=f"{post['title']} - Nic Fishman",
+            title=f"{post['title']} - {site.title}",
             description=post['blurb'],
-            post=post
+            canonical_url=f"{site.site_url}/posts/{post['slug']}/",
+            post=post,
+            highlighted=has_highlighting(post['content'])
         )
-        ensure_dir(OUTPUT_DIR / 'posts' / post['slug'])
-        (OUTPUT_DIR / 'posts' / post['slug'] / 'index.html').write_text(post_html)
+        write_page(site, site.output_dir / 'posts' / post['slug'] / 'index.html', post_html, image_variants, manifest,
+                   list((site.posts_dir / post['slug']).iterdir()) + [base_template, site.templates_dir / 'post.html'])
+
+def build_highlight_css(site, posts):
+    """Write the stylesheet for highlighted code if any post has some, returning True if needed"""
+    from highlight import has_highlighting, pygments_version, stylesheet
     
-    # Build papers page
+    if pygments_version() is None:
+        if any('<code class="language-' in post['content'] for post in posts):
+            print("Warning: pygments not installed. Skipping syntax highlighting.")
+        return False
+    if not any(has_highlighting(post['content']) for post in posts):
+        return False
+    write_if_changed(site.output_dir / 'static' / 'css' / 'highlight.css', stylesheet(HIGHLIGHT_STYLE))
+    return True
+
+def build_papers_page(site, env, papers, image_variants, manifest):
+    """Render the papers page from (published, working) lists"""
     print("Building papers page...")
-    papers_json_file = SOURCE_DIR / 'papers.json'
-    published_papers = []
-    working_papers = []
-    
-    if papers_json_file.exists():
-        with open(papers_json_file, 'r') as f:
-            papers_data = json.load(f)
-            # Handle both old format (list) and new format (dict with published/working)
-            if isinstance(papers_data, dict):
-                published_papers = papers_data.get('published', [])
-                working_papers = papers_data.get('working', [])
-            else:
-                # Old format - organize on the fly
-                for paper in papers_data:
-                    venue = paper.get('venue', '').lower()
-                    year = paper.get('year', '')
-                    if venue and venue.strip() and 'in preparation' not in venue.lower():
-                        if any(journal in venue.lower() for journal in ['science', 'nature', 'advances in neural', 'neurips', 'proceedings', 'journal', 'conference', 'arxiv', 'transactions', 'icml', 'opt']):
-                            published_papers.append(paper)
-                        elif year and year.isdigit() and int(year) >= 2018:
-                            published_papers.append(paper)
-                        else:
-                            working_papers.append(paper)
-                    else:
-                        working_papers.append(paper)
-    
-    # Sort by year
-    published_papers.sort(key=lambda p: (p.get('year', '') or '0'), reverse=True)
-    working_papers.sort(key=lambda p: (p.get('year', '') or '0'), reverse=True)
+    published_papers, working_papers = papers
     
     papers_template = env.get_template('papers.html')
     papers_html = papers_template.render(
         active_page='papers',
-        title='Papers - Nic Fishman',
+        title=f"Papers - {site.title}",
         description='Research publications',
+        canonical_url=f"{site.site_url}/papers/",
         published_papers=published_papers,
         working_papers=working_papers
     )
-    ensure_dir(OUTPUT_DIR / 'papers')
-    (OUTPUT_DIR / 'papers' / 'index.html').write_text(papers_html)
+    write_page(site, site.output_dir / 'papers' / 'index.html', papers_html, image_variants, manifest,
+               [papers_path(site), site.templates_dir / 'base.html', site.templates_dir / 'papers.html'])
+
+def build_member_papers_pages(site, env, papers, image_variants, manifest):
+    """
+    Render a papers page per group member at /papers/<slug>/.
+    
+    Only used when scholar_profiles.json lists more than one profile. Each
+    page is filtered from the merged papers index by the 'members' field and
+    bolds only that member's name. Papers without members (manual entries)
+    are attributed to the first profile.
+    """
+    import fetch_scholar
     
-    # Build talks page
+    profiles = fetch_scholar.load_profiles(site.scholar_profiles_file)
+    if len(profiles) < 2:
+        return
+    
+    print(f"Building papers pages for {len(profiles)} members...")
+    papers_template = env.get_template('papers.html')
+    default_member = profiles[0]['slug']
+    
+    def member_view(section, profile):
+        view = []
+        for paper in section:
+            if profile['slug'] in paper.get('members', [default_member]):
+                paper = dict(paper)
+                plain_authors = re.sub(r'<[^>]+>', '', paper.get('authors', '') or '')
+                paper['authors'] = fetch_scholar.format_author_list(plain_authors, bold_name=profile['name'])
+                view.append(paper)
+        return view
+    
+    published_papers, working_papers = papers
+    for profile in profiles:
+        papers_html = papers_template.render(
+            active_page='papers',
+            title=f"Papers - {profile['name']}",
+            description=f"Research publications by {profile['name']}",
+            canonical_url=f"{site.site_url}/papers/{profile['slug']}/",
+            scholar_id=profile['id'],
+            published_papers=member_view(published_papers, profile),
+            working_papers=member_view(working_papers, profile)
+        )
+        write_page(site, site.output_dir / 'papers' / profile['slug'] / 'index.html', papers_html, image_variants, manifest,
+                   [papers_path(site), site.scholar_profiles_file,
+                    site.templates_dir / 'base.html', site.templates_dir / 'papers.html'])
+
+def build_talks_page(site, env, talks, image_variants, manifest):
+    """Render the talks page"""
     print("Building talks page...")
     talks_template = env.get_template('talks.html')
     # Sort talks by date (newest first)
     talks_sorted = sorted(talks, key=lambda t: t.get('date', ''), reverse=True) if talks else []
     talks_html = talks_template.render(
         active_page='talks',
-        title='Talks - Nic Fishman',
+        title=f"Talks - {site.title}",
         description='Presentations and invited talks',
+        canonical_url=f"{site.site_url}/talks/",
         talks=talks_sorted
     )
-    ensure_dir(OUTPUT_DIR / 'talks')
-    (OUTPUT_DIR / 'talks' / 'index.html').write_text(talks_html)
+    write_page(site, site.output_dir / 'talks' / 'index.html', talks_html, image_variants, manifest,
+               [site.source_dir / 'talks.json', site.templates_dir / 'base.html', site.templates_dir / 'talks.html'])
+
+def build_search_page(site, env, image_variants, manifest):
+    """Render the search page (the index itself is built by build_search)"""
+    search_template = env.get_template('search.html')
+    search_html = search_template.render(
+        active_page='search',
+        title=f"Search - {site.title}",
+        description='Search posts, papers and talks',
+        canonical_url=f"{site.site_url}/search/"
+    )
+    write_page(site, site.output_dir / 'search' / 'index.html', search_html, image_variants, manifest,
+               [site.templates_dir / 'base.html', site.templates_dir / 'search.html'])
+
+def build_search(site, posts, papers, talks):
+    """Build the client-side search index"""
+    import search_index
+    
+    print("Building search index...")
+    published_papers, working_papers = papers
+    documents = (search_index.post_documents(posts)
+                 + search_index.paper_documents(published_papers + working_papers)
+                 + search_index.talk_documents(talks))
+    search_stats = search_index.build_search_index(
+        documents, site.output_dir / 'static' / 'search', site.search_cache_file
+    )
+    print(f"  Indexed {search_stats['documents']} documents "
+          f"({search_stats['reindexed']} re-tokenized) into {search_stats['shards']} shards")
+
+def load_posts_or_raise(site):
+    """Load posts, printing a traceback before re-raising on failure"""
+    try:
+        return load_posts(site)
+    except Exception as e:
+        print(f"Error loading posts: {e}")
+        import traceback
+        traceback.print_exc()
+        raise
+
+def make_environment(site):
+    """
+    Set up the Jinja2 environment, sharing compiled templates across builds and sites.
+    
+    Templates see the SiteConfig as `site`, and can call
+    last_modified('talks.json') for the date a file in the site's source
+    directory was last committed ('' if unknown).
+    """
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+    
+    ensure_dir(TEMPLATE_CACHE_DIR)
+    env = Environment(
+        loader=FileSystemLoader(str(site.templates_dir)),
+        autoescape=select_autoescape(['html', 'xml']),
+        bytecode_cache=FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR))
+    )
+    env.globals['site'] = site
+    history = git_history()
+    env.globals['last_modified'] = lambda path: format_date(history.last_modified(site.source_dir / path))
+    return env
+
+def build_output(site, offline=False, scholar_deadline=SCHOLAR_DEADLINE):
+    """
+    Build the entire static site described by a SiteConfig into site.output_dir.
+    
+    The build is a graph of stages run by stages.run_stages(): each stage
+    lists the stages whose outputs it needs, and independent stages (static
+    copying, post rendering, the Scholar fetch and CV compilation, ...) run
+    concurrently. With offline=True the Google Scholar fetch is skipped
+    entirely and the last papers.json is used as-is.
+    
+    The Scholar fetch runs in the background with a deadline while pages,
+    feeds, the search index and the CV are built from the existing
+    papers.json; only if the fetch changed papers.json are they rebuilt.
+    
+    Returns True if every page is within its weight budget.
+    """
+    from stages import Stage, run_stages
+    
+    print(f"Building static site {site.name}...")
     
-    print(f"Site built successfully! Output in {OUTPUT_DIR}/")
+    def fetch():
+        if offline:
+            print("Offline mode: skipping Google Scholar fetch, using existing papers.json")
+            return False
+        if not site.scholar:
+            return False
+        if not site.scholar_profiles_file.exists():
+            print(f"No {site.scholar_profiles_file}: skipping Google Scholar fetch")
+            return False
+        return fetch_papers(site, scholar_deadline)
+    
+    def images(static):
+        image_variants = build_image_variants(site, static)
+        print_asset_summary(static)
+        return image_variants
+    
+    def sitemap(manifest):
+        # Build sitemap from the page manifest
+        print("Building sitemap...")
+        build_sitemap(site, manifest)
+        save_manifest(site, manifest)
+    
+    def report_feeds(posts, papers):
+        print("Building feeds...")
+        build_feeds(site, posts, papers[0] + papers[1])
+    
+    def refresh(fetch, env, images, manifest, posts, talks, papers_page, member_pages, feeds, search, pdfs):
+        # Re-render everything derived from papers.json if the fetch changed it
+        if not fetch:
+            return
+        print("papers.json changed, rebuilding papers page, feeds, search index and CV...")
+        papers = load_papers(site)
+        build_papers_page(site, env, papers, images, manifest)
+        build_member_papers_pages(site, env, papers, images, manifest)
+        report_feeds(posts, papers)
+        build_search(site, posts, papers, talks)
+        build_cv(site)
+        optimize_pdfs(site, publish_cv(site))
+    
+    results = run_stages([
+        # Data: the Scholar fetch runs in the background; everything else
+        # starts from the existing papers.json
+        Stage('fetch', fetch),
+        Stage('cv', lambda: build_cv(site)),
+        Stage('papers', lambda: load_papers(site)),
+        Stage('posts', lambda: load_posts_or_raise(site)),
+        Stage('talks', lambda: load_talks(site)),
+        
+        # Page hashes from the previous build, for sitemap lastmod values
+        Stage('manifest', lambda: load_manifest(site)),
+        Stage('env', lambda: make_environment(site)),
+        
+        # Static files, responsive image variants and web-optimized PDFs
+        Stage('static', lambda: copy_static_files(site, new_asset_stats())),
+        Stage('images', images, requires=['static']),
+        Stage('highlight_css', lambda static, posts: build_highlight_css(site, posts), requires=['static', 'posts']),
+        Stage('cv_publish', lambda cv, static: publish_cv(site), requires=['cv', 'static']),
+        Stage('pdfs', lambda static, cv_publish: optimize_pdfs(site), requires=['static', 'cv_publish']),
+        
+        # Pages
+        Stage('index_page', lambda env, images, manifest: build_index_page(site, env, images, manifest),
+              requires=['env', 'images', 'manifest']),
+        Stage('post_pages', lambda env, posts, images, manifest: build_post_pages(site, env, posts, images, manifest),
+              requires=['env', 'posts', 'images', 'manifest']),
+        Stage('papers_page', lambda env, papers, images, manifest: build_papers_page(site, env, papers, images, manifest),
+              requires=['env', 'papers', 'images', 'manifest']),
+        Stage('member_pages', lambda env, papers, images, manifest: build_member_papers_pages(site, env, papers, images, manifest),
+              requires=['env', 'papers', 'images', 'manifest']),
+        Stage('talks_page', lambda env, talks, images, manifest: build_talks_page(site, env, talks, images, manifest),
+              requires=['env', 'talks', 'images', 'manifest']),
+        Stage('search_page', lambda env, images, manifest: build_search_page(site, env, images, manifest),
+              requires=['env', 'images', 'manifest']),
+        
+        # Derived outputs
+        Stage('feeds', report_feeds, requires=['posts', 'papers']),
+        Stage('search', lambda posts, papers, talks: build_search(site, posts, papers, talks),
+              requires=['posts', 'papers', 'talks']),
+        Stage('refresh', refresh,
+              requires=['fetch', 'env', 'images', 'manifest', 'posts', 'talks',
+                        'papers_page', 'member_pages', 'feeds', 'search', 'pdfs']),
+        Stage('sitemap', lambda manifest, refresh, **pages: sitemap(manifest),
+              requires=['manifest', 'refresh', 'index_page', 'post_pages', 'papers_page',
+                        'member_pages', 'talks_page', 'search_page']),
+        Stage('fonts', lambda **pages: build_web_fonts(site),
+              requires=['static', 'refresh', 'index_page', 'post_pages', 'papers_page',
+                        'member_pages', 'talks_page', 'search_page']),
+        
+        # Drop static files nothing links to, once every output is written
+        Stage('prune', lambda **outputs: prune_static_assets(site),
+              requires=['fonts', 'pdfs', 'images', 'highlight_css', 'sitemap', 'feeds', 'search', 'refresh']),
+        Stage('service_worker', lambda env, prune: build_service_worker(site, env), requires=['env', 'prune']),
+        Stage('budgets', lambda service_worker: check_page_budgets(site), requires=['service_worker']),
+    ])
+    critical_css = _critical_css.get(site.name)
+    if critical_css is not None:
+        print(f"Critical CSS: {critical_css.extracted} extractions, "
+              f"{len(critical_css.used) - critical_css.extracted} reused from cache")
+        critical_css.save()
+    posts = results['posts']
+    talks = results['talks']
+    
+    print(f"Site built successfully! Output in {site.output_dir}/")
     print(f"Total posts: {len(posts)}")
     print(f"Total talks: {len(talks)}")
     
     # Verify critical files were created
     critical_files = [
-        OUTPUT_DIR / 'index.html',
-        OUTPUT_DIR / 'papers' / 'index.html',
-        OUTPUT_DIR / 'posts' / 'index.html',
-        OUTPUT_DIR / 'talks' / 'index.html',
+        site.output_dir / 'index.html',
+        site.output_dir / 'papers' / 'index.html',
+        site.output_dir / 'posts' / 'index.html',
+        site.output_dir / 'talks' / 'index.html',
     ]
     print("\nVerifying build output:")
     all_present = True
@@ -418,14 +1626,93 @@ def build_site():
         raise RuntimeError("Build failed: Some critical files were not created!")
     
     # List all top-level files
-    print(f"\nFiles in {OUTPUT_DIR}:")
-    for item in sorted(OUTPUT_DIR.iterdir()):
+    print(f"\nFiles in {site.output_dir}:")
+    for item in sorted(site.output_dir.iterdir()):
         if item.is_file():
             print(f"  {item.name}")
         elif item.is_dir():
             print(f"  {item.name}/")
+    
+    return results['budgets']
+
+def build_site(site, offline=False, scholar_deadline=SCHOLAR_DEADLINE, ignore_budgets=False):
+    """
+    Build a site into a fresh staging directory and publish it.
+    
+    The staging directory (in site.builds_dir) starts empty, so nothing the
+    build no longer produces survives; once it is complete, files identical
+    to the live build's are replaced by hardlinks to them. Only after
+    build_output() succeeds is site.output_dir switched to the new build,
+    atomically; a failed build is discarded and the live site never shows a
+    half-written tree. A build with pages over their weight budgets is
+    discarded the same way unless ignore_budgets is set. The newest
+    BUILDS_KEPT builds are kept.
+    
+    Returns True if every page is within its weight budget.
+    """
+    from staged_output import (current_build, finish_build, new_staging_dir, prune_builds,
+                               publish_build, share_unchanged)
+    
+    staging = new_staging_dir(site.builds_dir)
+    previous = current_build(site.output_dir)
+    try:
+        within_budget = build_output(site.staged(staging), offline, scholar_deadline)
+        if not within_budget and not ignore_budgets:
+            shutil.rmtree(staging, ignore_errors=True)
+            print(f"Not publishing {site.name}: pages are over their weight budgets; {site.output_dir}/ is unchanged")
+            return False
+        if previous is not None:
+            print(f"{share_unchanged(staging, previous)} files unchanged since {previous}")
+        build = finish_build(staging)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    
+    publish_build(site.output_dir, build)
+    dropped = prune_builds(site.builds_dir, BUILDS_KEPT, site.output_dir)
+    print(f"Published {build} as {site.output_dir}/ ({len(dropped)} old builds removed)")
+    return within_budget
+
+def rollback_site(site):
+    """Switch a site's live output back to its previous build"""
+    from staged_output import rollback
+    
+    build = rollback(site.output_dir, site.builds_dir)
+    if build is None:
+        print(f"{site.name}: no earlier build in {site.builds_dir} to roll back to")
+    else:
+        print(f"{site.name}: {site.output_dir}/ now serves {build}")
+    return build
+
+def build_sites(sites, offline=False, scholar_deadline=SCHOLAR_DEADLINE, ignore_budgets=False):
+    """
+    Build several sites concurrently, returning {site name: within budget}.
+    
+    The sites share the Jinja bytecode cache, the rendered-Markdown cache,
+    the asset store and the image, PDF and font caches, so a file common to
+    several sites is processed and stored once. Once every site is built,
+    store objects that no kept build links to are removed.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    if len(sites) == 1:
+        results = {sites[0].name: build_site(sites[0], offline, scholar_deadline, ignore_budgets)}
+    else:
+        with ThreadPoolExecutor(max_workers=len(sites)) as pool:
+            futures = {site.name: pool.submit(build_site, site, offline, scholar_deadline, ignore_budgets) for site in sites}
+        results = {name: future.result() for name, future in futures.items()}
+    
+    removed, freed = prune_asset_store()
+    print(f"Asset store: {removed} unused objects removed ({freed / (1024 * 1024):.1f} MB)")
+    return results
+
+def configured_sites():
+    """Sites from SITES_FILE, or just DEFAULT_SITE if there is none"""
+    if SITES_FILE.exists():
+        return load_sites(SITES_FILE, SITE_CACHE_DIR)
+    return [DEFAULT_SITE]
 
-def deploy_to_gh_pages():
+def deploy_to_gh_pages(site):
     """Deploy built site to gh-pages branch"""
     print("\n" + "="*60)
     print("Deploying to gh-pages branch...")
@@ -445,38 +1732,25 @@ def deploy_to_gh_pages():
     current_branch = result.stdout.strip()
     
     # Verify site was built before deploying
-    if not OUTPUT_DIR.exists():
-        print(f"Error: {OUTPUT_DIR} directory does not exist!")
-        print("Please run build_site() first. Build automatically runs before deploy.")
+    if not site.output_dir.exists():
+        print(f"Error: {site.output_dir} directory does not exist!")
+        print("Please run build_site(site) first. Build automatically runs before deploy.")
         return
     
-    index_file = OUTPUT_DIR / 'index.html'
+    index_file = site.output_dir / 'index.html'
     if not index_file.exists():
         print(f"Error: {index_file} does not exist!")
         print("Site build may have failed. Please check build output.")
         return
     
-    # Get absolute path to site directory (before switching branches)
-    site_path = OUTPUT_DIR.resolve()
+    # Resolve the published build (before switching branches). Builds are
+    # never modified once published, so it can be copied from directly.
+    site_path = site.output_dir.resolve()
     print(f"✓ Found built site at {site_path}")
     
-    # Copy entire site to temporary location BEFORE switching branches
-    # This ensures files are available even if git operations affect the site directory
-    import tempfile
-    temp_deploy_dir = Path(tempfile.mkdtemp(prefix='site_deploy_'))
-    print(f"  Copying site to temporary location: {temp_deploy_dir}")
-    
-    if not site_path.exists():
-        print(f"Error: Site directory {site_path} does not exist!")
-        return
-    
-    # Copy entire site directory to temp location
-    temp_site_path = temp_deploy_dir / 'site'
-    shutil.copytree(site_path, temp_site_path)
-    
-    # Enumerate files to copy from temp location
+    # Enumerate files to copy
     items_to_copy = []
-    for item in temp_site_path.iterdir():
+    for item in site_path.iterdir():
         if item.name != '.git':
             items_to_copy.append(item)
     
@@ -484,7 +1758,6 @@ def deploy_to_gh_pages():
     
     if not items_to_copy:
         print("Error: No files found in site directory to copy!")
-        shutil.rmtree(temp_deploy_dir, ignore_errors=True)
         return
     
     # Stash any uncommitted changes
@@ -559,8 +1832,8 @@ def deploy_to_gh_pages():
         
         print(f"✓ Copied {files_copied} files/directories")
         
-        # Add all files
-        subprocess.run(['git', 'add', '-A'], check=True)
+        # Add the site's files (not untracked build output such as site.builds/)
+        subprocess.run(['git', 'add', '-A', '--'] + [item.name for item in items_to_copy], check=True)
         
         # Check if there are changes to commit
         result = subprocess.run(['git', 'status', '--porcelain'],
@@ -593,11 +1866,6 @@ def deploy_to_gh_pages():
         print(f"Error during deployment: {e}")
         print("Switching back to original branch...")
     finally:
-        # Clean up temporary directory
-        if 'temp_deploy_dir' in locals() and temp_deploy_dir.exists():
-            print(f"Cleaning up temporary directory: {temp_deploy_dir}")
-            shutil.rmtree(temp_deploy_dir, ignore_errors=True)
-        
         # Switch back to original branch
         print(f"Switching back to {current_branch} branch...")
         subprocess.run(['git', 'checkout', current_branch], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
@@ -607,13 +1875,48 @@ def deploy_to_gh_pages():
 
 
 if __name__ == '__main__':
-    import sys
+    import argparse
     
-    build_site()
+    parser = argparse.ArgumentParser(description='Build the static site')
+    parser.add_argument('-d', '--deploy', action='store_true',
+                        help='deploy the built site to the gh-pages branch')
+    parser.add_argument('--offline', action='store_true',
+                        help='skip the Google Scholar fetch and use the existing papers.json')
+    parser.add_argument('--scholar-deadline', type=float, default=SCHOLAR_DEADLINE, metavar='SECONDS',
+                        help=f'stop waiting for Google Scholar after this long (default: {SCHOLAR_DEADLINE})')
+    parser.add_argument('--ignore-budgets', action='store_true',
+                        help='report pages over their weight budgets without failing the build')
+    parser.add_argument('--site', action='append', metavar='NAME',
+                        help=f'build only this site from {SITES_FILE} (repeatable; default: all)')
+    parser.add_argument('--rollback', action='store_true',
+                        help='switch each site back to its previous build instead of building')
+    args = parser.parse_args()
+    
+    sites = configured_sites()
+    if args.site:
+        unknown = sorted(set(args.site) - {site.name for site in sites})
+        if unknown:
+            parser.error(f"unknown site(s): {', '.join(unknown)}")
+        sites = [site for site in sites if site.name in args.site]
+    
+    if args.rollback:
+        missing = [site.name for site in sites if rollback_site(site) is None]
+        raise SystemExit(1 if missing else 0)
+    
+    results = build_sites(sites, offline=args.offline, scholar_deadline=args.scholar_deadline,
+                          ignore_budgets=args.ignore_budgets)
+    over_budget = [site for site in sites if not results[site.name]]
+    if over_budget and not args.ignore_budgets:
+        reports = ', '.join(str(site.budget_report_file) for site in over_budget)
+        print(f"\nBuild failed: pages are over their weight budgets (see {reports})")
+        raise SystemExit(1)
     
     # Deploy to gh-pages if requested
-    if '--deploy' in sys.argv or '-d' in sys.argv:
-        deploy_to_gh_pages()
+    if args.deploy:
+        if len(sites) > 1:
+            print("\nWarning: --deploy publishes a single site; pass --site NAME. Skipping deployment.")
+        else:
+            deploy_to_gh_pages(sites[0])
     else:
         print("\nTip: Run with --deploy to automatically deploy to gh-pages")
 
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Critical CSS
+Works out which rules of a stylesheet can apply to a rendered page, inlines
+them into the page's <head> and loads the full stylesheet without blocking
+render. Matching is by the tags, classes and ids a selector names, so it
+errs on the side of including a rule: pseudo-classes, :not() and attribute
+selectors are treated as matching.
+"""
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Tuple
+
+
+COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+TAG_RE = re.compile(r'<([a-zA-Z][\w-]*)')
+CLASS_ATTR_RE = re.compile(r'\sclass\s*=\s*(["\'])(.*?)\1', re.I | re.S)
+ID_ATTR_RE = re.compile(r'\sid\s*=\s*(["\'])(.*?)\1', re.I)
+
+# Parts of a selector that don't narrow which pages it can match
+SELECTOR_NOISE_RE = re.compile(r'::?[\w-]+(?:\([^)]*\))?|\[[^\]]*\]')
+SELECTOR_TAG_RE = re.compile(r'(?<![\w.#-])([a-zA-Z][\w-]*)')
+SELECTOR_CLASS_RE = re.compile(r'\.([\w-]+)')
+SELECTOR_ID_RE = re.compile(r'#([\w-]+)')
+
+# At-rules whose blocks hold ordinary rules to filter
+CONDITIONAL_AT_RULES = ('@media', '@supports')
+
+# At-rules left to the full stylesheet
+DEFERRED_AT_RULES = ('@font-face', '@keyframes', '@-webkit-keyframes', '@import')
+
+
+def parse_rules(css: str) -> List[Tuple[str, object]]:
+    """
+    Split CSS into (prelude, body) pairs. The body of a conditional at-rule
+    is itself a list of pairs; every other body is the declaration text.
+    """
+    css = COMMENT_RE.sub('', css)
+    rules = []
+    i = 0
+    while i < len(css):
+        start = css.find('{', i)
+        if start == -1:
+            break
+        prelude = css[i:start].strip()
+        # Statement at-rules (@charset, @import) end at ';' before any block
+        while prelude.startswith('@') and ';' in prelude:
+            rules.append((prelude[:prelude.index(';') + 1].strip(), None))
+            prelude = prelude[prelude.index(';') + 1:].strip()
+        depth = 0
+        end = start
+        while end < len(css):
+            if css[end] == '{':
+                depth += 1
+            elif css[end] == '}':
+                depth -= 1
+                if depth == 0:
+                    break
+            end += 1
+        body = css[start + 1:end]
+        if prelude.lower().startswith(CONDITIONAL_AT_RULES):
+            rules.append((prelude, parse_rules(body)))
+        else:
+            rules.append((prelude, body.strip()))
+        i = end + 1
+    return rules
+
+
+def split_selectors(prelude: str) -> List[str]:
+    """Split a selector list on top-level commas"""
+    parts, depth, current = [], 0, ''
+    for ch in prelude:
+        if ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+            continue
+        current += ch
+    parts.append(current.strip())
+    return [p for p in parts if p]
+
+
+def page_tokens(html: str) -> FrozenSet[str]:
+    """Tags, .classes and #ids present in a page"""
+    tokens = {t.lower() for t in TAG_RE.findall(html)}
+    tokens.update({'html', 'body', ':root'})
+    for _, classes in CLASS_ATTR_RE.findall(html):
+        tokens.update('.' + c for c in classes.split())
+    for _, ids in ID_ATTR_RE.findall(html):
+        tokens.add('#' + ids.strip())
+    return frozenset(tokens)
+
+
+def selector_matches(selector: str, tokens: FrozenSet[str]) -> bool:
+    """Whether every tag, class and id a selector names is on the page"""
+    if selector.startswith(':root'):
+        return True
+    simple = SELECTOR_NOISE_RE.sub(' ', selector)
+    needed = {t.lower() for t in SELECTOR_TAG_RE.findall(simple)}
+    needed.update('.' + c for c in SELECTOR_CLASS_RE.findall(simple))
+    needed.update('#' + i for i in SELECTOR_ID_RE.findall(simple))
+    return needed <= tokens
+
+
+def critical_rules(rules: List[Tuple[str, object]], tokens: FrozenSet[str]) -> str:
+    """Serialize the rules that can apply to a page with these tokens"""
+    out = []
+    for prelude, body in rules:
+        if prelude.startswith('@'):
+            if prelude.lower().startswith(DEFERRED_AT_RULES) or body is None:
+                continue
+            if isinstance(body, list):
+                inner = critical_rules(body, tokens)
+                if inner:
+                    out.append(f"{prelude}{{{inner}}}")
+            continue
+        selectors = [s for s in split_selectors(prelude) if selector_matches(s, tokens)]
+        if selectors:
+            out.append(f"{','.join(selectors)}{{{minify_declarations(body)}}}")
+    return ''.join(out)
+
+
+def minify_declarations(body: str) -> str:
+    """Collapse whitespace in a declaration block"""
+    body = re.sub(r'\s+', ' ', body).strip()
+    return re.sub(r';\s+', ';', body).rstrip(';')
+
+
+class CriticalCSS:
+    """
+    Inlines the critical part of one stylesheet into pages.
+
+    Extraction is cached by stylesheet hash and the page's token set, both
+    in memory and in cache_file, so pages built from the same template with
+    the same kinds of elements share one extraction. Safe to use from
+    several threads.
+    """
+
+    def __init__(self, css_path: Path, href: str, cache_file: Path):
+        self.href = href
+        self.cache_file = cache_file
+        css = css_path.read_text(encoding='utf-8') if css_path.exists() else ''
+        self.css_hash = hashlib.sha256(css.encode('utf-8')).hexdigest()
+        self.rules = parse_rules(css)
+        self.lock = threading.Lock()
+        self.extracted = 0
+        self.cache: Dict[str, str] = {}
+        if cache_file.exists():
+            try:
+                self.cache = json.loads(cache_file.read_text())
+            except ValueError:
+                self.cache = {}
+        self.used = set()
+
+    def extract(self, html: str) -> str:
+        """Critical CSS for a page"""
+        tokens = page_tokens(html)
+        key = hashlib.sha256((self.css_hash + ' '.join(sorted(tokens))).encode('utf-8')).hexdigest()
+        with self.lock:
+            self.used.add(key)
+            if key in self.cache:
+                return self.cache[key]
+        css = critical_rules(self.rules, tokens)
+        with self.lock:
+            self.cache[key] = css
+            self.extracted += 1
+        return css
+
+    def inline(self, html: str) -> str:
+        """Replace the page's blocking stylesheet link with inlined critical CSS"""
+        link = re.search(
+            r'<link\s+rel="stylesheet"\s+href="' + re.escape(self.href) + r'"\s*/?>', html
+        )
+        if not link or not self.rules:
+            return html
+        critical = self.extract(html)
+        replacement = (
+            f'<style>{critical}</style>\n'
+            f'    <link rel="preload" href="{self.href}" as="style" '
+            f'onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+            f'    <noscript><link rel="stylesheet" href="{self.href}"></noscript>'
+        )
+        return html[:link.start()] + replacement + html[link.end():]
+
+    def save(self):
+        """Write the cache, keeping only extractions used by this build"""
+        with self.lock:
+            cache = {k: v for k, v in self.cache.items() if k in self.used}
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        self.cache_file.write_text(json.dumps(cache, sort_keys=True))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Atom and JSON Feed Generation
+Renders feeds for posts and papers. Output depends only on the entries, never
+on the time of the build, so an unchanged entry set produces byte-identical
+feeds (and stable Last-Modified/ETag headers for feed readers).
+"""
+import hashlib
+import html
+import json
+import re
+import time
+from typing import Dict, List
+from xml.sax.saxutils import escape, quoteattr
+
+
+# Used for the feed-level timestamp when there are no entries
+EPOCH = "1970-01-01T00:00:00Z"
+
+
+def rfc3339(date_tuple) -> str:
+    """Format a time.struct_time as an RFC 3339 UTC timestamp"""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', date_tuple)
+
+
+def strip_tags(markup: str) -> str:
+    """Plain-text version of an HTML fragment"""
+    return html.unescape(re.sub(r'<[^>]+>', '', markup or '')).strip()
+
+
+def post_entries(posts: List[Dict], site_url: str, limit: int) -> List[Dict]:
+    """Feed entries for the newest posts (posts are already sorted newest first)"""
+    entries = []
+    for post in posts[:limit]:
+        url = f"{site_url}/posts/{post['slug']}/"
+        entries.append({
+            'id': url,
+            'url': url,
+            'title': post['title'],
+            'summary': post.get('blurb', ''),
+            'content_html': post.get('content', ''),
+            'published': rfc3339(post['date_sort']),
+            'updated': rfc3339(post.get('updated_sort', post['date_sort'])),
+        })
+    return entries
+
+
+def paper_entries(papers: List[Dict], site_url: str, limit: int) -> List[Dict]:
+    """Feed entries for the newest papers"""
+    papers = sorted(papers, key=lambda p: (p.get('year', '') or '0'), reverse=True)
+    entries = []
+    for paper in papers[:limit]:
+        title = strip_tags(paper.get('title', ''))
+        if not title:
+            continue
+        url = paper.get('pub_url') or paper.get('pdf_link') or paper.get('eprint_url')
+        if not url:
+            url = f"{site_url}/papers/#" + hashlib.sha1(title.lower().encode('utf-8')).hexdigest()[:12]
+        year = paper.get('year', '') or ''
+        authors = strip_tags(paper.get('authors', ''))
+        venue = paper.get('venue', '') or ''
+        entries.append({
+            'id': url,
+            'url': url,
+            'title': title,
+            'summary': ', '.join(p for p in (authors, venue, year) if p),
+            'content_html': '',
+            'updated': f"{year}-01-01T00:00:00Z" if year.isdigit() else EPOCH,
+        })
+    return entries
+
+
+def atom_feed(title: str, site_url: str, feed_url: str, page_url: str, entries: List[Dict],
+              author: str) -> str:
+    """Render an Atom 1.0 feed"""
+    updated = max((e['updated'] for e in entries), default=EPOCH)
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        f'<feed xmlns="http://www.w3.org/2005/Atom" xml:base={quoteattr(site_url + "/")}>',
+        f'  <title>{escape(title)}</title>',
+        f'  <id>{escape(feed_url)}</id>',
+        f'  <link rel="self" href={quoteattr(feed_url)}/>',
+        f'  <link rel="alternate" href={quoteattr(page_url)}/>',
+        f'  <updated>{updated}</updated>',
+        f'  <author><name>{escape(author)}</name><uri>{escape(site_url)}/</uri></author>',
+    ]
+    for entry in entries:
+        lines.append('  <entry>')
+        lines.append(f"    <title>{escape(entry['title'])}</title>")
+        lines.append(f"    <id>{escape(entry['id'])}</id>")
+        lines.append(f"    <link rel=\"alternate\" href={quoteattr(entry['url'])}/>")
+        if entry.get('published'):
+            lines.append(f"    <published>{entry['published']}</published>")
+        lines.append(f"    <updated>{entry['updated']}</updated>")
+        if entry['summary']:
+            lines.append(f"    <summary>{escape(entry['summary'])}</summary>")
+        if entry['content_html']:
+            lines.append(f"    <content type=\"html\">{escape(entry['content_html'])}</content>")
+        lines.append('  </entry>')
+    lines.append('</feed>')
+    return '\n'.join(lines) + '\n'
+
+
+def json_feed(title: str, site_url: str, feed_url: str, page_url: str, entries: List[Dict],
+              author: str) -> str:
+    """Render a JSON Feed 1.1 document"""
+    items = []
+    for entry in entries:
+        item = {
+            'id': entry['id'],
+            'url': entry['url'],
+            'title': entry['title'],
+            'date_published': entry.get('published', entry['updated']),
+        }
+        if entry['updated'] != item['date_published']:
+            item['date_modified'] = entry['updated']
+        if entry['summary']:
+            item['summary'] = entry['summary']
+        if entry['content_html']:
+            item['content_html'] = entry['content_html']
+        else:
+            item['content_text'] = entry['summary'] or entry['title']
+        items.append(item)
+    feed = {
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': title,
+        'home_page_url': page_url,
+        'feed_url': feed_url,
+        'authors': [{'name': author, 'url': f"{site_url}/"}],
+        'items': items,
+    }
+    return json.dumps(feed, indent=2, ensure_ascii=False) + '\n'
@@ -6,15 +6,22 @@ Intelligently merges duplicates, keeping the entry with the most information.
 """
 import json
 import re
+import threading
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Set
+from typing import Dict, Iterable, List, Set
 from difflib import SequenceMatcher
 
-from scholarly import scholarly
+from venues import canonical_venue, classify_paper
 
 
-GOOGLE_SCHOLAR_ID = "saYhrnwAAAAJ"
+# Requests to Google Scholar are spaced at least this far apart, across all threads
+SCHOLAR_REQUEST_INTERVAL = 0.5
+
+# Profiles and publications filled concurrently
+SCHOLAR_WORKERS = 4
 
 
 def normalize_title(title: str) -> str:
@@ -44,11 +51,14 @@ def format_author_list(authors, bold_name="Nic Fishman"):
     Rules:
     - <= 3 authors: use "and" between all (e.g., "A and B and C")
     - > 3 authors: use commas with "and" before last (e.g., "A, B, C, and D")
-    - Bold the specified name if it appears in the list
+    - Bold the specified name if it appears in the list (bold_name may also be
+      a list of names, e.g. every member of a group)
     """
     if not authors:
         return ""
     
+    bold_names = [bold_name] if isinstance(bold_name, str) else list(bold_name or [])
+    
     # Handle list or string input
     if isinstance(authors, list):
         author_list = [str(a).strip() for a in authors if str(a).strip()]
@@ -79,7 +89,7 @@ def format_author_list(authors, bold_name="Nic Fishman"):
         if '<b>' in author_str or '<strong>' in author_str:
             # Already has bold tags, keep as is
             formatted_authors.append(author_str)
-        elif bold_name.lower() in clean_author.lower():
+        elif any(name.lower() in clean_author.lower() for name in bold_names):
             formatted_authors.append(f'<b>{author_str}</b>')
         else:
             formatted_authors.append(author_str)
@@ -102,7 +112,6 @@ def extract_venue_from_citation(citation: str) -> str:
         return ""
     
     citation = citation.strip()
-    citation_lower = citation.lower()
     
     # Common patterns in citations:
     # "OPT 2024: Optimization for Machine Learning, 2024"
@@ -126,14 +135,10 @@ def extract_venue_from_citation(citation: str) -> str:
         if venue:
             return venue
     
-    # Special case: FAccT conference (often truncated with ellipsis)
-    if 'fairness' in citation_lower and 'accountability' in citation_lower:
-        year_match = re.search(r'\d{4}', citation)
-        year = year_match.group(0) if year_match else ''
-        if year:
-            return f"Proceedings of the {year} ACM Conference on Fairness, Accountability, and Transparency"
-        else:
-            return "Proceedings of the ACM Conference on Fairness, Accountability, and Transparency"
+    # Scholar truncates long venue names (e.g. FAccT) with an ellipsis
+    canonical = canonical_venue(citation_clean)
+    if canonical != citation_clean:
+        return canonical
     
     # Pattern 4: Split by comma and take everything except standalone years
     parts = citation_clean.split(',')
@@ -238,95 +243,186 @@ def merge_paper_entries(paper1: Dict, paper2: Dict) -> Dict:
     # If either was auto-fetched, mark as potentially auto-fetched
     merged['auto_fetched'] = merged.get('auto_fetched', False) or local.get('auto_fetched', False)
     
+    # A paper belongs to every group member either entry was fetched for
+    members = list(merged.get('members', []))
+    members += [m for m in local.get('members', []) if m not in members]
+    if members:
+        merged['members'] = members
+    
     return merged
 
 
-def fetch_google_scholar_publications() -> List[Dict]:
+class RateLimiter:
+    """Space out calls from any number of threads to at most one per `interval` seconds"""
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next = 0.0
+    
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def load_profiles(profiles_file: Path) -> List[Dict]:
+    """
+    Load the Scholar profiles to aggregate.
+    
+    profiles_file is a JSON list of {"id", "name", "slug"} objects, one per
+    group member. Without it there is nothing to fetch, and [] is returned.
+    """
+    if profiles_file and profiles_file.exists():
+        with open(profiles_file, 'r') as f:
+            return json.load(f)
+    return []
+
+
+def fetch_profile_stubs(profile: Dict, scholarly, limiter: RateLimiter) -> List[Dict]:
+    """Fetch one author's publication list (unfilled stubs) from Google Scholar"""
+    print(f"Fetching publications for Google Scholar ID: {profile['id']} ({profile['name']})")
+    limiter.wait()
+    author = scholarly.search_author_id(profile['id'])
+    limiter.wait()
+    author = scholarly.fill(author)
+    stubs = author.get('publications', [])
+    print(f"Found {len(stubs)} publications for {profile['name']}")
+    return stubs
+
+
+def build_paper(filled_pub: Dict, bold_names: List[str]) -> Dict:
+    """Convert a filled scholarly publication into a papers.json entry"""
+    # Extract information
+    title = filled_pub.get('bib', {}).get('title', '')
+    
+    # Handle authors - can be list or string
+    author_list = filled_pub.get('bib', {}).get('author', [])
+    # Format authors with proper comma/and delimiters and bold group members
+    authors = format_author_list(author_list, bold_name=bold_names)
+    
+    venue = filled_pub.get('bib', {}).get('venue', '') or filled_pub.get('bib', {}).get('journal', '')
+    year = filled_pub.get('bib', {}).get('pub_year', '')
+    citation = filled_pub.get('bib', {}).get('citation', '')
+    
+    # If venue is missing but citation exists, try to extract venue from citation
+    if not venue and citation:
+        venue = extract_venue_from_citation(citation)
+    
+    # Get publication URL
+    pub_url = filled_pub.get('pub_url', '')
+    eprint_url = filled_pub.get('eprint_url', '')
+    
+    # Try to get PDF link from pub_url or eprint_url
+    pdf_link = None
+    if pub_url:
+        pdf_link = pub_url
+    elif eprint_url:
+        pdf_link = eprint_url
+    
+    # Build citation string if not provided
+    if not citation and (authors or venue or year):
+        citation_parts = []
+        if authors:
+            citation_parts.append(authors)
+        if title:
+            citation_parts.append(f'"{title}"')
+        if venue:
+            citation_parts.append(venue)
+        if year:
+            citation_parts.append(str(year))
+        citation = ', '.join(citation_parts)
+    
+    return {
+        'title': title,
+        'authors': authors,
+        'venue': venue or '',
+        'year': str(year) if year else '',
+        'citation': citation,
+        'pdf_link': pdf_link,
+        'pub_url': pub_url,
+        'eprint_url': eprint_url,
+        'source': 'google_scholar',
+        'auto_fetched': True
+    }
+
+
+def fetch_google_scholar_publications(partial_file: Path, profiles: List[Dict]) -> List[Dict]:
     """
     Fetch publications from Google Scholar using scholarly library.
     Gets full publication details including authors, venue, year, citations, and links.
+    
+    Every profile in `profiles` is fetched concurrently under one shared rate
+    limit. Publications listed on several members' profiles are deduplicated
+    by normalized title before filling, so each shared paper is filled once
+    and records every member it belongs to in its 'members' field.
+    
+    If partial_file is given, each publication is appended to it as a JSON line
+    as soon as it is filled, so a caller that has to stop the fetch at a
+    deadline can still merge what was gathered.
     """
+    # scholarly pulls in a large HTTP/proxy stack, so only import it when
+    # we are actually about to talk to Google Scholar
+    from scholarly import scholarly
+    
+    bold_names = [p['name'] for p in profiles]
+    limiter = RateLimiter(SCHOLAR_REQUEST_INTERVAL)
+    
     publications = []
+    partial = None
+    partial_lock = threading.Lock()
+    if partial_file:
+        partial_file.parent.mkdir(parents=True, exist_ok=True)
+        partial = open(partial_file, 'w')
+    
+    def fill(stub, members):
+        try:
+            limiter.wait()
+            # Fill publication details
+            paper = build_paper(scholarly.fill(stub), bold_names)
+        except Exception as e:
+            print(f"Error processing publication: {e}")
+            return None
+        if not paper['title']:  # Only add if we have a title
+            return None
+        paper['members'] = members
+        if partial:
+            with partial_lock:
+                partial.write(json.dumps(paper, ensure_ascii=False) + '\n')
+                partial.flush()
+        return paper
     
     try:
-        print(f"Fetching publications for Google Scholar ID: {GOOGLE_SCHOLAR_ID}")
-        
-        # Get author profile
-        author = scholarly.search_author_id(GOOGLE_SCHOLAR_ID)
-        
-        # Fill author profile with publications
-        author = scholarly.fill(author)
-        
-        print(f"Found {len(author.get('publications', []))} publications")
-        
-        # Process each publication
-        for pub in author.get('publications', []):
-            try:
-                # Fill publication details
-                filled_pub = scholarly.fill(pub)
-                
-                # Extract information
-                title = filled_pub.get('bib', {}).get('title', '')
-                
-                # Handle authors - can be list or string
-                author_list = filled_pub.get('bib', {}).get('author', [])
-                # Format authors with proper comma/and delimiters and bold Nic Fishman
-                authors = format_author_list(author_list, bold_name="Nic Fishman")
-                
-                venue = filled_pub.get('bib', {}).get('venue', '') or filled_pub.get('bib', {}).get('journal', '')
-                year = filled_pub.get('bib', {}).get('pub_year', '')
-                citation = filled_pub.get('bib', {}).get('citation', '')
-                
-                # If venue is missing but citation exists, try to extract venue from citation
-                if not venue and citation:
-                    venue = extract_venue_from_citation(citation)
-                
-                # Get publication URL
-                pub_url = filled_pub.get('pub_url', '')
-                eprint_url = filled_pub.get('eprint_url', '')
-                
-                # Try to get PDF link from pub_url or eprint_url
-                pdf_link = None
-                if pub_url:
-                    pdf_link = pub_url
-                elif eprint_url:
-                    pdf_link = eprint_url
-                
-                # Build citation string if not provided
-                if not citation and (authors or venue or year):
-                    citation_parts = []
-                    if authors:
-                        citation_parts.append(authors)
-                    if title:
-                        citation_parts.append(f'"{title}"')
-                    if venue:
-                        citation_parts.append(venue)
-                    if year:
-                        citation_parts.append(str(year))
-                    citation = ', '.join(citation_parts)
-                
-                paper = {
-                    'title': title,
-                    'authors': authors,
-                    'venue': venue or '',
-                    'year': str(year) if year else '',
-                    'citation': citation,
-                    'pdf_link': pdf_link,
-                    'pub_url': pub_url,
-                    'eprint_url': eprint_url,
-                    'source': 'google_scholar',
-                    'auto_fetched': True
-                }
-                
-                if title:  # Only add if we have a title
+        with ThreadPoolExecutor(max_workers=SCHOLAR_WORKERS) as pool:
+            # Publication lists for every member
+            stub_lists = {}
+            futures = {pool.submit(fetch_profile_stubs, p, scholarly, limiter): p for p in profiles}
+            for future in as_completed(futures):
+                profile = futures[future]
+                try:
+                    stub_lists[profile['slug']] = future.result()
+                except Exception as e:
+                    print(f"Error fetching profile {profile['name']}: {e}")
+            
+            # Shared papers are filled once, on behalf of every member listing them
+            unique = {}
+            for profile in profiles:
+                for stub in stub_lists.get(profile['slug'], []):
+                    key = normalize_title(stub.get('bib', {}).get('title', '')) or id(stub)
+                    if key in unique:
+                        unique[key][1].append(profile['slug'])
+                    else:
+                        unique[key] = (stub, [profile['slug']])
+            shared = sum(1 for _, members in unique.values() if len(members) > 1)
+            if len(profiles) > 1:
+                print(f"{len(unique)} unique publications across {len(profiles)} profiles ({shared} shared)")
+            
+            for paper in pool.map(lambda item: fill(*item), unique.values()):
+                if paper:
                     publications.append(paper)
-                
-                # Small delay to avoid rate limiting
-                time.sleep(0.5)
-                
-            except Exception as e:
-                print(f"Error processing publication: {e}")
-                continue
         
         print(f"Successfully fetched {len(publications)} publications from Google Scholar")
         
@@ -335,18 +431,37 @@ def fetch_google_scholar_publications() -> List[Dict]:
         print("Continuing with existing papers only...")
         import traceback
         traceback.print_exc()
+    finally:
+        if partial:
+            partial.close()
     
     return publications
 
 
+def load_partial_publications(partial_file: Path) -> List[Dict]:
+    """Read the publications a (possibly interrupted) fetch wrote to partial_file"""
+    publications = []
+    if not partial_file.exists():
+        return publications
+    with open(partial_file, 'r') as f:
+        for line in f:
+            try:
+                publications.append(json.loads(line))
+            except ValueError:
+                # The last line may be cut short if the fetch was killed mid-write
+                break
+    return publications
+
+
 def load_existing_papers(papers_json: Path) -> List[Dict]:
-    """Load existing papers from papers.json, handling both old and new formats"""
+    """Load existing papers from papers.json (or papers.jsonl), handling both old and new formats"""
+    from paper_store import load_papers_data
+    
     if not papers_json.exists():
         return []
     
     try:
-        with open(papers_json, 'r') as f:
-            papers_data = json.load(f)
+        papers_data = load_papers_data(papers_json)
         
         # Handle both formats: dict with published/working or flat list
         if isinstance(papers_data, dict):
@@ -360,57 +475,32 @@ def load_existing_papers(papers_json: Path) -> List[Dict]:
         return []
 
 
-def organize_papers(papers: List[Dict]) -> Dict:
+def organize_papers(papers: List[Dict], bold_names: List[str] = None) -> Dict:
     """Organize papers into published and working sections"""
-    published = []
-    working = []
-    
-    # Publication venue indicators
-    publication_indicators = [
-        'science', 'nature', 'neurips', 'advances in neural', 'neural information processing',
-        'proceedings', 'journal', 'conference', 'transactions', 'icml', 'acl', 'opt', 'acm',
-        'fairness', 'accountability', 'ijcai', 'aaai', 'iclr', 'jmlr', 'pami', 'cvpr', 'eccv', 'iccv'
-    ]
+    bold_names = bold_names or []
+
+    organized = {'published': [], 'working': []}
     
     for paper in papers:
-        venue = paper.get('venue', '').strip()
-        citation = paper.get('citation', '').strip()
+        venue = (paper.get('venue') or '').strip()
+        citation = (paper.get('citation') or '').strip()
         
         # If venue is empty but citation exists, try to extract venue from citation
         if not venue and citation:
             venue = extract_venue_from_citation(citation)
-            paper['venue'] = venue
+        canonical = canonical_venue(venue)
+        if canonical != paper.get('venue'):
+            paper['venue'] = canonical
         
         # Format authors consistently
         authors = paper.get('authors', '')
         if authors and isinstance(authors, str) and authors.strip():
-            paper['authors'] = format_author_list(authors, bold_name="Nic Fishman")
+            paper['authors'] = format_author_list(authors, bold_name=bold_names)
         
-        venue_lower = venue.lower() if venue else ''
-        citation_lower = citation.lower() if citation else ''
-        
-        # Check if arXiv-only (working paper)
-        if venue_lower and 'arxiv' in venue_lower:
-            # Check if there's also a publication venue indicator
-            has_publication = any(ind in venue_lower or ind in citation_lower for ind in publication_indicators)
-            if not has_publication:
-                working.append(paper)
-                continue
-        
-        # Check for working paper indicators
-        if 'in preparation' in venue_lower or 'in prep' in venue_lower:
-            working.append(paper)
-            continue
-        
-        # Check if venue looks like a publication venue
-        # Check both venue and citation for publication indicators
-        is_published = any(indicator in venue_lower or indicator in citation_lower for indicator in publication_indicators)
-        
-        if is_published:
-            published.append(paper)
-        else:
-            # Default to working if no clear publication indicator
-            working.append(paper)
+        organized[classify_paper(paper)].append(paper)
+    
+    published = organized['published']
+    working = organized['working']
     
     # Sort by year (newest first)
     published.sort(key=lambda p: (p.get('year', '') or '0'), reverse=True)
@@ -428,59 +518,148 @@ def deduplicate_and_merge_papers(existing_papers: List[Dict], scholar_papers: Li
     manual_papers = [p for p in existing_papers if p.get('source') == 'manual' or not p.get('auto_fetched', False)]
     
     # Start with all papers
-    all_papers = manual_papers + scholar_papers
+    return merge_similar_papers(manual_papers + scholar_papers)
+
+
+def merge_partial_papers(existing_papers: List[Dict], partial_papers: List[Dict]) -> List[Dict]:
+    """
+    Merge publications from an incomplete fetch into the existing list.
     
-    # Group similar papers
-    merged_papers = []
-    processed_indices: Set[int] = set()
+    Unlike deduplicate_and_merge_papers(), previously auto-fetched papers are
+    kept, since a partial fetch says nothing about the publications it did
+    not reach. Fresh entries come first so they win ties when merging.
+    """
+    return merge_similar_papers(partial_papers + existing_papers)
+
+
+# Titles with a similarity ratio above this are treated as the same paper
+SIMILARITY_THRESHOLD = 0.85
+
+# Title words shared by more papers than this are too common to find duplicates by
+MAX_BLOCK_SIZE = 500
+
+
+class PaperIndex:
+    """
+    Incremental duplicate detection by title similarity.
+    
+    Papers are added one at a time. Each new paper is merged into the first
+    earlier group whose leading title is more than SIMILARITY_THRESHOLD
+    similar, otherwise it starts a new group. Candidate groups are found
+    through exact normalized titles and titles sharing at least half their
+    word prefixes, and cheap length/quick_ratio bounds are checked before the
+    full SequenceMatcher ratio, so adding a paper does not compare it against
+    every other one.
+    """
     
-    for i, paper1 in enumerate(all_papers):
-        if i in processed_indices:
-            continue
+    def __init__(self):
+        self.papers: List[Dict] = []
+        self._norms: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._words: Dict[str, List[int]] = {}
+        self._word_counts: List[int] = []
+    
+    @staticmethod
+    def _blocking_words(norm: str) -> Set[str]:
+        # Word prefixes, so truncated or pluralized words still share a key
+        words = norm.split()
+        return {w[:3] for w in words if len(w) >= 3} or set(words)
+    
+    def _find_group(self, norm: str):
+        group = self._exact.get(norm)
+        if group is not None:
+            return group
         
-        # Find similar papers
-        similar_papers = [paper1]
+        # Probe through the more selective title words; a very common word
+        # is only used when the title has nothing rarer to offer
+        words = self._blocking_words(norm)
+        blocks = [self._words.get(word, ()) for word in words]
+        selective = [b for b in blocks if len(b) <= MAX_BLOCK_SIZE]
+        shared = Counter()
+        for block in selective or blocks:
+            shared.update(block)
         
-        for j, paper2 in enumerate(all_papers[i+1:], start=i+1):
-            if j in processed_indices:
-                continue
-            
-            # Check title similarity
-            similarity = title_similarity(paper1.get('title', ''), paper2.get('title', ''))
-            
-            # Consider similar if similarity > 0.85 (85% match)
-            if similarity > 0.85:
-                similar_papers.append(paper2)
-                processed_indices.add(j)
-        
-        # Merge all similar papers
-        merged = similar_papers[0]
-        for similar in similar_papers[1:]:
-            merged = merge_paper_entries(merged, similar)
+        # Near-identical titles share most of their words
+        candidates = [
+            group for group, count in shared.items()
+            if count * 2 >= min(len(selective or blocks), self._word_counts[group])
+        ]
         
-        merged_papers.append(merged)
-        processed_indices.add(i)
-    
-    return merged_papers
+        # SequenceMatcher caches its analysis of the second sequence, so the
+        # new title goes there and each candidate leader is swapped in as the
+        # first, matching title_similarity(leader, title)
+        matcher = SequenceMatcher(None, '', norm)
+        for group in sorted(candidates):
+            leader = self._norms[group]
+            # ratio() can never exceed 2 * min(len) / (len + len)
+            if 2 * min(len(leader), len(norm)) <= SIMILARITY_THRESHOLD * (len(leader) + len(norm)):
+                continue
+            matcher.set_seq1(leader)
+            if matcher.quick_ratio() > SIMILARITY_THRESHOLD and matcher.ratio() > SIMILARITY_THRESHOLD:
+                return group
+        return None
+    
+    def add(self, paper: Dict):
+        """Add a paper, merging it into an existing entry if it is a duplicate"""
+        norm = normalize_title(paper.get('title', ''))
+        group = self._find_group(norm)
+        if group is None:
+            group = len(self.papers)
+            self.papers.append(paper)
+            self._norms.append(norm)
+            words = self._blocking_words(norm)
+            for word in words:
+                self._words.setdefault(word, []).append(group)
+            self._word_counts.append(len(words))
+        else:
+            self.papers[group] = merge_paper_entries(self.papers[group], paper)
+        self._exact.setdefault(norm, group)
+
 
+def merge_similar_papers(all_papers: Iterable[Dict]) -> List[Dict]:
+    """Group papers with similar titles and merge each group into one entry"""
+    index = PaperIndex()
+    for paper in all_papers:
+        index.add(paper)
+    return index.papers
 
-def update_papers_config(papers: List[Dict], output_file: Path):
-    """Save papers to a JSON config file, organized by published/working"""
-    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+def update_papers_config(papers: List[Dict], output_file: Path, bold_names: List[str] = None) -> bool:
+    """
+    Save papers to a JSON config file, organized by published/working.
+    
+    A .jsonl output_file is saved as a JSON Lines paper store (see
+    paper_store.py). Either way the file is replaced atomically, and left
+    untouched if its contents would not change. Returns True if it was written.
+    """
+    from paper_store import save_papers_data
     
     # Organize papers
-    organized = organize_papers(papers)
+    organized = organize_papers(papers, bold_names)
     
-    with open(output_file, 'w') as f:
-        json.dump(organized, f, indent=2, ensure_ascii=False)
+    if not save_papers_data(organized, output_file):
+        print(f"No changes to {output_file}")
+        return False
     
     print(f"Saved {len(organized['published'])} published and {len(organized['working'])} working papers to {output_file}")
+    return True
 
 
-def main():
-    """Main function to fetch and merge publications"""
-    base_dir = Path(__file__).parent
-    papers_json = base_dir / 'njwfish' / 'papers.json'
+def main(partial_file: Path = None, source_dir: Path = None, profiles_file: Path = None):
+    """
+    Main function to fetch and merge publications into source_dir's papers
+    (default njwfish/) from the profiles in profiles_file (default
+    source_dir/scholar_profiles.json)
+    """
+    from paper_store import papers_file
+    
+    if source_dir is None:
+        source_dir = Path(__file__).parent / 'njwfish'
+    papers_json = papers_file(source_dir)
+    profiles = load_profiles(profiles_file or source_dir / 'scholar_profiles.json')
+    if not profiles:
+        print(f"No Scholar profiles in {profiles_file or source_dir / 'scholar_profiles.json'}; nothing to fetch")
+        return
     
     print("=" * 60)
     print("Google Scholar Publication Fetcher")
@@ -497,7 +676,7 @@ def main():
     print(f"  - {len(existing_papers) - len(manual_papers)} previously auto-fetched")
     
     print("\nFetching publications from Google Scholar...")
-    scholar_papers = fetch_google_scholar_publications()
+    scholar_papers = fetch_google_scholar_publications(partial_file, profiles)
     
     print("\nMerging and deduplicating publications...")
     merged = deduplicate_and_merge_papers(manual_papers, scholar_papers)
@@ -513,7 +692,7 @@ def main():
     print(f"  - Merged (both sources): {merged_count}")
     
     # Save merged list
-    update_papers_config(merged, papers_json)
+    update_papers_config(merged, papers_json, [p['name'] for p in profiles])
     
     print("\n" + "=" * 60)
     print("Done! Check papers.json for the merged results.")
@@ -521,4 +700,21 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    import sys
+    
+    # --partial PATH: stream each filled publication to PATH as JSON lines
+    partial_path = None
+    if '--partial' in sys.argv:
+        partial_path = Path(sys.argv[sys.argv.index('--partial') + 1])
+    
+    # --source DIR: the site source directory holding papers.json and scholar_profiles.json
+    source = None
+    if '--source' in sys.argv:
+        source = Path(sys.argv[sys.argv.index('--source') + 1])
+    
+    # --profiles PATH: the Scholar profiles to fetch (default: DIR/scholar_profiles.json)
+    profiles_path = None
+    if '--profiles' in sys.argv:
+        profiles_path = Path(sys.argv[sys.argv.index('--profiles') + 1])
+    
+    main(partial_path, source, profiles_path)
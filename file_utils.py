@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+File Utilities
+Writing generated files. A file in the build output may be a hardlink shared
+with the asset store or with an earlier build, so an existing file is always
+replaced rather than written through, which would change every copy.
+"""
+from pathlib import Path
+from typing import Union
+
+
+def write_if_changed(path: Path, data: Union[str, bytes]) -> bool:
+    """Write text (as UTF-8) or bytes to path only if its bytes differ, returning True if written"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if path.exists():
+        if path.read_bytes() == data:
+            return False
+        path.unlink()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return True
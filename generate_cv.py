@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Generate CV sections
+Renders every section of the CV (resume/*.tex, as cv.tex and resume.tex
+include them) from structured data through the LaTeX templates in
+latex_cv/templates/:
+
+- cv.json: education, honors, experience, committees, extracurriculars and
+  presentations that aren't on the talks page (values are LaTeX)
+- talks.json: the talks page's talks (plain text, escaped); a talk's optional
+  "cv" object overrides fields for the CV only (values are LaTeX)
+- papers.json: publications, formatted by generate_cv_papers.py
+
+A section file is only written when its bytes change, so xelatex inputs
+(and their mtimes) stay untouched when the data hasn't changed. build.py
+writes them to the site's cv_sections_dir; run on its own, this writes them
+to the git-ignored latex_cv/resume/ for compiling by hand.
+"""
+import json
+from pathlib import Path
+from typing import Dict, List
+
+from file_utils import write_if_changed
+from generate_cv_papers import escape_latex, format_paper, split_papers
+
+
+BASE_DIR = Path(__file__).parent
+SOURCE_DIR = BASE_DIR / 'njwfish'
+TEMPLATES_DIR = BASE_DIR / 'latex_cv' / 'templates'
+SECTIONS_DIR = BASE_DIR / 'latex_cv' / 'resume'
+
+SECTIONS = ['education', 'honors', 'writing', 'presentation', 'experience',
+            'committees', 'extracurricular']
+
+TALK_FIELDS = ('date', 'title', 'venue', 'location', 'description')
+
+
+def latex_env(templates_dir: Path = TEMPLATES_DIR):
+    """Jinja environment with delimiters that don't collide with LaTeX braces"""
+    from jinja2 import Environment, FileSystemLoader
+
+    return Environment(
+        loader=FileSystemLoader(str(templates_dir)),
+        block_start_string='<%', block_end_string='%>',
+        variable_start_string='<<', variable_end_string='>>',
+        comment_start_string='<#', comment_end_string='#>',
+        trim_blocks=True,
+        lstrip_blocks=True,
+        keep_trailing_newline=True,
+        autoescape=False,
+    )
+
+
+def load_json(path: Path, default):
+    """Load a JSON file, or default if it doesn't exist"""
+    if not path.exists():
+        return default
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def presentations(talks: List[Dict], extra: List[Dict]) -> List[Dict]:
+    """
+    Talks from talks.json (escaped) followed by CV-only presentations, newest
+    first; talks from the same year keep their order in the files.
+    """
+    merged = []
+    for talk in talks:
+        entry = {key: escape_latex(talk.get(key) or '') for key in TALK_FIELDS}
+        entry.update(talk.get('cv', {}))
+        merged.append(entry)
+    merged.extend({key: talk.get(key) or '' for key in TALK_FIELDS} for talk in extra)
+    merged.sort(key=lambda t: str(t['date']), reverse=True)
+    return merged
+
+
+def section_context(cv_data: Dict, talks: List[Dict], papers_data, source: str = SOURCE_DIR.name,
+                    bold_name: str = "Fishman") -> Dict:
+    """
+    Template variables for every section; `source` names the data's directory
+    and bold_name is bolded in author lists
+    """
+    published, working = split_papers(papers_data)
+    return {
+        'source': source,
+        'education': cv_data.get('education', []),
+        'honors': cv_data.get('honors', []),
+        'experience': cv_data.get('experience', []),
+        'committees': cv_data.get('committees', []),
+        'extracurricular': cv_data.get('extracurricular', []),
+        'presentations': presentations(talks, cv_data.get('presentations', [])),
+        'published': [format_paper(p, bold_name=bold_name) for p in published],
+        'working': [format_paper(p, is_working=True, bold_name=bold_name) for p in working],
+    }
+
+
+def render_sections(context: Dict, sections: List[str] = None,
+                    templates_dir: Path = TEMPLATES_DIR) -> Dict[str, str]:
+    """Render sections (all by default) to LaTeX, by section name"""
+    env = latex_env(templates_dir)
+    return {name: env.get_template(f"{name}.tex").render(**context)
+            for name in (sections or SECTIONS)}
+
+
+def generate_cv_sections(papers_path: Path, output_dir: Path = SECTIONS_DIR,
+                         sections: List[str] = None, source_dir: Path = SOURCE_DIR,
+                         templates_dir: Path = TEMPLATES_DIR, author: str = None) -> List[Path]:
+    """
+    Render CV sections into output_dir through templates_dir from
+    source_dir's cv.json and talks.json and the papers in papers_path,
+    bolding author's surname in author lists; returns the files that changed
+    """
+    from paper_store import load_papers_data
+
+    papers_data = load_papers_data(papers_path) if papers_path.exists() else {}
+    context = section_context(load_json(source_dir / 'cv.json', {}),
+                              load_json(source_dir / 'talks.json', []), papers_data,
+                              source=Path(source_dir).name,
+                              bold_name=author.split()[-1] if author else "Fishman")
+    changed = []
+    for name, text in render_sections(context, sections, templates_dir or TEMPLATES_DIR).items():
+        path = output_dir / f"{name}.tex"
+        if write_if_changed(path, text):
+            changed.append(path)
+    return changed
+
+
+if __name__ == '__main__':
+    import sys
+    from paper_store import papers_file
+
+    papers_json = Path(sys.argv[1]) if len(sys.argv) > 1 else papers_file(SOURCE_DIR)
+    output_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else SECTIONS_DIR
+
+    changed = generate_cv_sections(papers_json, output_dir)
+    print(f"Generated CV sections in {output_dir}: {len(changed)} of {len(SECTIONS)} changed")
+    for path in changed:
+        print(f"  {path}")
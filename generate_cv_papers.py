@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 """
 Generate CV publications section from papers.json
+Formats papers as LaTeX entries; generate_cv.py renders them (with the rest
+of the CV) through latex_cv/templates/writing.tex.
 """
-import json
 import re
 from pathlib import Path
 
+from venues import classify_paper
+
 def escape_latex(text):
     """Escape LaTeX special characters"""
     if not text:
@@ -109,10 +112,10 @@ def format_venue(venue_str):
     
     return f"\\textit{{{venue_str}}}"
 
-def format_paper(paper, is_working=False):
-    """Format a single paper entry"""
+def format_paper(paper, is_working=False, bold_name="Fishman"):
+    """Format a single paper entry, bolding authors matching bold_name"""
     title = escape_latex(paper.get('title', 'Untitled'))
-    authors = format_authors(paper.get('authors', ''))
+    authors = format_authors(paper.get('authors', ''), bold_name)
     venue = paper.get('venue', '')
     year = paper.get('year', '')
     
@@ -141,87 +144,53 @@ def format_paper(paper, is_working=False):
     
     return entry
 
-def generate_cv_writing(papers_json_path, output_path):
-    """Generate CV writing.tex file from papers.json"""
-    
-    # Load papers
-    with open(papers_json_path, 'r') as f:
-        papers_data = json.load(f)
-    
-    # Extract published and working papers
+def split_papers(papers_data):
+    """Published and working papers, newest first"""
     if isinstance(papers_data, dict):
-        published_papers = papers_data.get('published', [])
-        working_papers = papers_data.get('working', [])
+        published_papers = list(papers_data.get('published', []))
+        working_papers = list(papers_data.get('working', []))
     else:
         # Old format - organize
         published_papers = []
         working_papers = []
         for paper in papers_data:
-            venue = paper.get('venue', '').lower()
-            year = paper.get('year', '')
-            if venue and venue.strip() and 'in preparation' not in venue.lower():
-                if any(journal in venue.lower() for journal in ['science', 'nature', 'advances in neural', 'neurips', 'proceedings', 'journal', 'conference', 'arxiv', 'transactions', 'icml', 'opt']):
-                    published_papers.append(paper)
-                elif year and year.isdigit() and int(year) >= 2018:
-                    published_papers.append(paper)
-                else:
-                    working_papers.append(paper)
+            if classify_paper(paper) == 'published':
+                published_papers.append(paper)
             else:
                 working_papers.append(paper)
     
     # Sort by year (newest first)
     published_papers.sort(key=lambda p: (p.get('year', '') or '0'), reverse=True)
     working_papers.sort(key=lambda p: (p.get('year', '') or '0'), reverse=True)
-    
-    # Generate LaTeX
-    latex_content = """%-------------------------------------------------------------------------------
-%	SECTION TITLE
-%-------------------------------------------------------------------------------
-\\cvsection{Publications}
-\\begin{cvparagraph}
-
-\\honorpositionstyle{Published Papers}
-
-\\begin{addmargin}[2em]{0em}
-
-"""
-    
-    # Add published papers
-    for paper in published_papers:
-        entry = format_paper(paper, is_working=False)
-        latex_content += entry + "\n\n"
-    
-    latex_content += """\\end{addmargin}
+    return published_papers, working_papers
 
-\\honorpositionstyle{Working Papers}
-
-\\begin{addmargin}[2em]{0em}
-
-"""
-    
-    # Add working papers
-    for paper in working_papers:
-        entry = format_paper(paper, is_working=True)
-        latex_content += entry + "\n\n"
-    
-    latex_content += """\\end{addmargin}
-
-\\end{cvparagraph}
-"""
-    
-    # Write output
-    with open(output_path, 'w') as f:
-        f.write(latex_content)
-    
-    print(f"Generated CV writing section: {output_path}")
+def generate_cv_writing(papers_json_path, output_path):
+    """Generate CV writing.tex file from papers.json (or papers.jsonl)"""
+    from paper_store import load_papers_data
+    from file_utils import write_if_changed
+    from generate_cv import render_sections
+    
+    published_papers, working_papers = split_papers(load_papers_data(papers_json_path))
+    latex_content = render_sections({
+        'source': Path(papers_json_path).parent.name,
+        'published': [format_paper(p) for p in published_papers],
+        'working': [format_paper(p, is_working=True) for p in working_papers],
+    }, ['writing'])['writing']
+    
+    # Leave the file (and its mtime) alone if nothing changed
+    if write_if_changed(Path(output_path), latex_content):
+        print(f"Generated CV writing section: {output_path}")
+    else:
+        print(f"CV writing section unchanged: {output_path}")
     print(f"  Published papers: {len(published_papers)}")
     print(f"  Working papers: {len(working_papers)}")
 
 if __name__ == '__main__':
     import sys
+    from paper_store import papers_file
     
     # Default paths
-    papers_json = Path(__file__).parent / 'njwfish' / 'papers.json'
+    papers_json = papers_file(Path(__file__).parent / 'njwfish')
     output_file = Path(__file__).parent / 'latex_cv' / 'resume' / 'writing.tex'
     
     if len(sys.argv) > 1:
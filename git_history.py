@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Git History
+First- and last-commit times for every file in the repository, from a single
+`git log --name-only` pass over the whole history rather than one `git log`
+per file. The map is cached by HEAD commit, so builds between commits only
+run `git rev-parse`.
+
+Files with uncommitted changes report their last commit, and in a shallow
+clone every file reports the oldest commit fetched; outside a git checkout
+nothing has a time and callers fall back to file mtimes.
+"""
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+def git(args, cwd: Path) -> Optional[str]:
+    """Output of a git command, or None if git is missing or the command fails"""
+    try:
+        result = subprocess.run(['git', '-c', 'core.quotepath=off'] + args, cwd=str(cwd),
+                                capture_output=True, text=True, encoding='utf-8')
+    except FileNotFoundError:
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def read_history(root: Path) -> Dict[str, List[int]]:
+    """Path (relative to root) -> [first, last] times of the commits that touched it"""
+    output = git(['log', '--format=%x00%ct', '--name-only'], root)
+    commits = {}
+    commit_time = None
+    for line in (output or '').splitlines():
+        if line.startswith('\0'):
+            commit_time = int(line[1:])
+        elif line and commit_time is not None:
+            # Newest commits come first, so the last one seen is the first
+            entry = commits.setdefault(line, [commit_time, commit_time])
+            entry[0] = min(entry[0], commit_time)
+            entry[1] = max(entry[1], commit_time)
+    return commits
+
+
+class GitHistory:
+    """First- and last-commit times for the files of one checkout"""
+
+    def __init__(self, root: Optional[Path] = None, commits: Optional[Dict[str, List[int]]] = None):
+        self.root = root.resolve() if root else None
+        self.commits = commits or {}
+
+    def _commits(self, path: Path) -> Optional[List[int]]:
+        if self.root is None:
+            return None
+        try:
+            relative = Path(path).resolve().relative_to(self.root)
+        except ValueError:
+            return None
+        return self.commits.get(relative.as_posix())
+
+    def first_committed(self, path: Path) -> Optional[int]:
+        """Commit time of the first commit touching path, or None if unknown"""
+        commits = self._commits(path)
+        return commits[0] if commits else None
+
+    def last_modified(self, path: Path) -> Optional[int]:
+        """Commit time of the last commit touching path, or None if unknown"""
+        commits = self._commits(path)
+        return commits[1] if commits else None
+
+    def oldest(self, paths: Iterable[Path]) -> Optional[int]:
+        """Earliest first_committed() among paths, or None if none are known"""
+        times = [t for t in (self.first_committed(p) for p in paths) if t is not None]
+        return min(times) if times else None
+
+    def newest(self, paths: Iterable[Path]) -> Optional[int]:
+        """Latest last_modified() among paths, or None if none are known"""
+        times = [t for t in (self.last_modified(p) for p in paths) if t is not None]
+        return max(times) if times else None
+
+
+def load_history(cache_file: Path, cwd: Path = Path('.')) -> GitHistory:
+    """
+    The GitHistory of the checkout containing cwd, reusing cache_file if it
+    was written at the same HEAD commit
+    """
+    output = git(['rev-parse', 'HEAD', '--show-toplevel'], cwd)
+    if output is None:
+        return GitHistory()
+    head, root = output.splitlines()[:2]
+
+    if cache_file.exists():
+        cached = json.loads(cache_file.read_text(encoding='utf-8'))
+        if cached.get('head') == head and cached.get('root') == root and 'commits' in cached:
+            return GitHistory(Path(root), cached['commits'])
+
+    commits = read_history(Path(root))
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps({'head': head, 'root': root, 'commits': commits}, sort_keys=True), encoding='utf-8')
+    os.replace(tmp, cache_file)
+    return GitHistory(Path(root), commits)
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    history = load_history(Path('.build_cache') / 'git_history.json')
+    for arg in sys.argv[1:]:
+        stamp = history.last_modified(Path(arg))
+        print(f"{arg}: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stamp)) if stamp else 'unknown'}")
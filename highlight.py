@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Syntax Highlighting
+Highlights the fenced code blocks in rendered Markdown with Pygments at
+build time, so pages need no client-side highlighter. Each highlighted
+block is cached by a hash of its language, code and style (and the Pygments
+version), so a rebuild only lexes blocks that changed. Blocks without a
+language, or in a language Pygments doesn't know, are left as they are.
+
+The token colours come from one shared stylesheet, stylesheet(style).
+"""
+import hashlib
+import html
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+# Fenced code as the Markdown fenced_code extension renders it
+CODE_BLOCK_RE = re.compile(r'<pre><code class="language-([^"]+)">(.*?)</code></pre>', re.S)
+
+# Wrapper class of highlighted blocks, and the scope of the stylesheet
+CSS_CLASS = 'highlight'
+
+
+def pygments_version() -> Optional[str]:
+    """The installed Pygments version, or None if it isn't installed"""
+    try:
+        import pygments
+    except ImportError:
+        return None
+    return pygments.__version__
+
+
+def highlight_block(lang: str, code: str, style: str, cache_dir: Path) -> Optional[str]:
+    """Highlighted HTML for one block of code, or None if lang isn't a known language"""
+    import pygments
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+
+    key = hashlib.sha256('\0'.join([pygments.__version__, style, lang, code]).encode('utf-8')).hexdigest()
+    cached = cache_dir / f"{key}.html"
+    if cached.exists():
+        return cached.read_text(encoding='utf-8')
+
+    try:
+        lexer = get_lexer_by_name(lang)
+    except ClassNotFound:
+        return None
+    fragment = pygments.highlight(code, lexer, HtmlFormatter(style=style, cssclass=CSS_CLASS, wrapcode=True))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(fragment, encoding='utf-8')
+    os.replace(tmp, cached)
+    return fragment
+
+
+def highlight_html(markup: str, style: str, cache_dir: Path) -> str:
+    """markup with every fenced code block in a known language highlighted"""
+    def replace(match):
+        fragment = highlight_block(match.group(1), html.unescape(match.group(2)), style, cache_dir)
+        return fragment if fragment is not None else match.group(0)
+
+    return CODE_BLOCK_RE.sub(replace, markup)
+
+
+def has_highlighting(markup: str) -> bool:
+    """Whether markup contains a highlighted block (and so needs the stylesheet)"""
+    return f'<div class="{CSS_CLASS}">' in markup
+
+
+def stylesheet(style: str) -> str:
+    """CSS for highlighted blocks in style, leaving backgrounds to the site's own pre rules"""
+    from pygments.formatters import HtmlFormatter
+
+    return HtmlFormatter(style=style, cssclass=CSS_CLASS, nobackground=True).get_style_defs(f'.{CSS_CLASS}') + '\n'
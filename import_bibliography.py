@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+BibTeX / CSL-JSON Import
+Streams large .bib and CSL-JSON files record by record, maps each record onto
+the papers.json fields and merges it into papers.json through the same
+title-similarity deduplication used for Google Scholar results. Only the
+merged paper list is held in memory, never the whole source file.
+
+Usage: python3 import_bibliography.py refs.bib [library.json ...] [--output papers.json|papers.jsonl] [--profiles scholar_profiles.json]
+"""
+import json
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from fetch_scholar import (
+    PaperIndex,
+    format_author_list,
+    load_existing_papers,
+    load_profiles,
+    update_papers_config,
+)
+
+
+# Bytes read from CSL-JSON files at a time
+READ_CHUNK_SIZE = 1 << 16
+
+BIBTEX_MONTHS = {
+    'jan': 'January', 'feb': 'February', 'mar': 'March', 'apr': 'April',
+    'may': 'May', 'jun': 'June', 'jul': 'July', 'aug': 'August',
+    'sep': 'September', 'oct': 'October', 'nov': 'November', 'dec': 'December',
+}
+
+# BibTeX entry types that are not bibliography records
+BIBTEX_SKIPPED_TYPES = {'comment', 'preamble'}
+
+
+# ---------------------------------------------------------------------------
+# BibTeX
+# ---------------------------------------------------------------------------
+
+def iter_bibtex_entries(path: Path) -> Iterator[str]:
+    """
+    Yield the raw text of each @entry in a .bib file.
+
+    The file is read character by character; only the entry currently being
+    scanned is buffered. Outside entries, an entry starts only at
+    `@type{` or `@type(`, so a stray @ (an email address in a comment) is
+    ignored. An entry ends at the brace or parenthesis that closes its
+    opener, outside any nested braces or quoted value. @comment and
+    @preamble entries are skipped.
+    """
+    buffer = []
+    entry_type = ''
+    header = None   # '@type' text while reading an entry header
+    closer = None   # '}' or ')' once inside an entry
+    depth = 0       # nested braces inside the entry
+    quoted = False  # inside a "..." value at the entry's top level
+
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            for ch in line:
+                if closer is None:
+                    if header is None:
+                        if ch == '@':
+                            header = ['@']
+                    elif ch in '{(' and len(header) > 1:
+                        closer = '}' if ch == '{' else ')'
+                        entry_type = ''.join(header[1:]).strip().lower()
+                        depth, quoted, buffer = 0, False, header + [ch]
+                        header = None
+                    elif (ch.isalnum() or ch == '_') and not header[-1].isspace():
+                        header.append(ch)
+                    elif ch.isspace() and len(header) > 1:
+                        header.append(ch)
+                    else:
+                        header = ['@'] if ch == '@' else None
+                    continue
+
+                buffer.append(ch)
+                if ch == '{':
+                    depth += 1
+                elif ch == '}' and depth > 0:
+                    depth -= 1
+                elif ch == '"' and depth == 0:
+                    quoted = not quoted
+                elif ch == closer and depth == 0 and not quoted:
+                    closer = None
+                    if entry_type not in BIBTEX_SKIPPED_TYPES:
+                        yield ''.join(buffer)
+
+
+def _read_bibtex_value(body: str, pos: int, macros: Dict[str, str]):
+    """Parse a field value (braced, quoted, bare, or '#'-concatenated) starting at pos"""
+    parts = []
+    while True:
+        while pos < len(body) and body[pos].isspace():
+            pos += 1
+        if pos >= len(body):
+            break
+        ch = body[pos]
+        if ch == '{':
+            depth = 0
+            start = pos + 1
+            while pos < len(body):
+                if body[pos] == '{':
+                    depth += 1
+                elif body[pos] == '}':
+                    depth -= 1
+                    if depth == 0:
+                        break
+                pos += 1
+            parts.append(body[start:pos])
+            pos += 1
+        elif ch == '"':
+            depth = 0
+            start = pos + 1
+            pos += 1
+            while pos < len(body) and not (body[pos] == '"' and depth == 0):
+                if body[pos] == '{':
+                    depth += 1
+                elif body[pos] == '}':
+                    depth -= 1
+                pos += 1
+            parts.append(body[start:pos])
+            pos += 1
+        else:
+            match = re.match(r'[^,#\s}]+', body[pos:])
+            token = match.group(0) if match else ''
+            pos += len(token)
+            parts.append(macros.get(token.lower(), BIBTEX_MONTHS.get(token.lower(), token)))
+        while pos < len(body) and body[pos].isspace():
+            pos += 1
+        if pos < len(body) and body[pos] == '#':
+            pos += 1
+            continue
+        break
+    return ''.join(parts), pos
+
+
+def parse_bibtex_entry(raw: str, macros: Dict[str, str]) -> Optional[Dict]:
+    """Parse one raw @entry into {'type', 'key', 'fields'}; @string entries update macros"""
+    match = re.match(r'@\s*(\w+)\s*[{(]', raw)
+    if not match:
+        return None
+    entry_type = match.group(1).lower()
+    if entry_type in BIBTEX_SKIPPED_TYPES:
+        return None
+    body = raw[match.end():-1]
+
+    key = ''
+    if entry_type != 'string':
+        key, _, body = body.partition(',')
+        key = key.strip()
+
+    fields = {}
+    pos = 0
+    while pos < len(body):
+        field = re.compile(r'\s*,?\s*([\w:.-]+)\s*=\s*').match(body, pos)
+        if not field:
+            break
+        value, pos = _read_bibtex_value(body, field.end(), macros)
+        fields[field.group(1).lower()] = value
+        while pos < len(body) and body[pos] in ', \t\r\n':
+            pos += 1
+
+    if entry_type == 'string':
+        for name, value in fields.items():
+            macros[name] = value
+        return None
+    return {'type': entry_type, 'key': key, 'fields': fields}
+
+
+# Combining characters for LaTeX accent commands
+LATEX_ACCENTS = {
+    '`': '\u0300', "'": '\u0301', '^': '\u0302', '~': '\u0303', '=': '\u0304',
+    'u': '\u0306', '.': '\u0307', '"': '\u0308', 'r': '\u030a', 'H': '\u030b',
+    'v': '\u030c', 'c': '\u0327', 'k': '\u0328',
+}
+
+
+def clean_latex(text: str) -> str:
+    """Strip the BibTeX/LaTeX markup commonly found in titles and names"""
+    if not text:
+        return ""
+    text = re.sub(r'\\(?:textbf|textit|emph|mathrm|text)\s*', '', text)
+    text = re.sub(
+        r"\\([`'^\"~=.uvHckr])\s*\{?(\w)\}?",
+        lambda m: unicodedata.normalize('NFC', m.group(2) + LATEX_ACCENTS[m.group(1)]),
+        text,
+    )
+    text = text.replace('\\&', '&').replace('--', '–').replace('~', ' ')
+    text = re.sub(r'[{}]', '', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def bibtex_name(name: str) -> str:
+    """Convert 'Last, First' to 'First Last'"""
+    name = clean_latex(name)
+    if ',' in name:
+        parts = [p.strip() for p in name.split(',')]
+        # 'von Last, Jr, First' -> 'First von Last Jr'
+        if len(parts) == 3:
+            return f"{parts[2]} {parts[0]} {parts[1]}".strip()
+        return f"{parts[1]} {parts[0]}".strip()
+    return name
+
+
+def bibtex_to_paper(entry: Dict, bold_names: List[str] = None) -> Optional[Dict]:
+    """Map a parsed BibTeX entry onto papers.json fields, bolding bold_names among the authors"""
+    fields = entry['fields']
+    title = clean_latex(fields.get('title', ''))
+    if not title:
+        return None
+
+    names = [bibtex_name(n) for n in re.split(r'\s+and\s+', fields.get('author', '')) if n.strip()]
+    venue = clean_latex(
+        fields.get('journal') or fields.get('booktitle') or fields.get('howpublished')
+        or fields.get('school') or fields.get('institution') or fields.get('publisher') or ''
+    )
+    if not venue and fields.get('eprint') and 'arxiv' in fields.get('archiveprefix', '').lower():
+        venue = f"arXiv preprint arXiv:{fields['eprint']}"
+
+    url = fields.get('url', '')
+    if not url and fields.get('doi'):
+        url = f"https://doi.org/{fields['doi']}"
+    github = fields.get('github', '') or fields.get('code', '')
+    if not github and 'github.com' in url:
+        github, url = url, ''
+
+    return make_paper(
+        title=title,
+        authors=names,
+        venue=venue,
+        year=fields.get('year', ''),
+        volume=fields.get('volume', ''),
+        number=fields.get('number', ''),
+        pages=fields.get('pages', '').replace('--', '-'),
+        url=url,
+        github=github,
+        source='bibtex',
+        bold_names=bold_names,
+    )
+
+
+def iter_bibtex_papers(path: Path, bold_names: List[str] = None) -> Iterator[Dict]:
+    """Stream papers from a .bib file"""
+    macros: Dict[str, str] = {}
+    for raw in iter_bibtex_entries(path):
+        entry = parse_bibtex_entry(raw, macros)
+        if entry:
+            paper = bibtex_to_paper(entry, bold_names)
+            if paper:
+                yield paper
+
+
+# ---------------------------------------------------------------------------
+# CSL-JSON
+# ---------------------------------------------------------------------------
+
+def iter_json_objects(path: Path) -> Iterator[Dict]:
+    """
+    Yield the objects of a top-level JSON array (or a JSON Lines file) one at
+    a time, decoding from a bounded read buffer.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    with open(path, 'r', encoding='utf-8') as f:
+        eof = False
+        while True:
+            stripped = buffer.lstrip(' \t\r\n,[]')
+            if stripped != buffer:
+                buffer = stripped
+            if buffer:
+                try:
+                    obj, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    if eof:
+                        raise
+                else:
+                    yield obj
+                    buffer = buffer[end:]
+                    continue
+            if eof:
+                return
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                eof = True
+            buffer += chunk
+
+
+def csl_name(name: Dict) -> str:
+    """Format a CSL name object"""
+    if name.get('literal'):
+        return name['literal']
+    parts = [name.get('given', ''), name.get('non-dropping-particle', ''), name.get('family', ''), name.get('suffix', '')]
+    return ' '.join(p for p in parts if p).strip()
+
+
+def csl_year(item: Dict) -> str:
+    """Year from a CSL date variable"""
+    for variable in ('issued', 'published-print', 'published-online', 'created'):
+        date = item.get(variable)
+        if isinstance(date, dict):
+            parts = date.get('date-parts')
+            if parts and parts[0] and parts[0][0]:
+                return str(parts[0][0])
+            raw = date.get('raw') or date.get('literal') or ''
+            match = re.search(r'\d{4}', str(raw))
+            if match:
+                return match.group(0)
+    return ''
+
+
+def csl_to_paper(item: Dict, bold_names: List[str] = None) -> Optional[Dict]:
+    """Map a CSL-JSON item onto papers.json fields, bolding bold_names among the authors"""
+    title = item.get('title', '')
+    if isinstance(title, list):
+        title = title[0] if title else ''
+    title = re.sub(r'<[^>]+>', '', title or '').strip()
+    if not title:
+        return None
+
+    venue = item.get('container-title') or item.get('event-title') or item.get('publisher') or ''
+    if isinstance(venue, list):
+        venue = venue[0] if venue else ''
+
+    url = item.get('URL', '')
+    if not url and item.get('DOI'):
+        url = f"https://doi.org/{item['DOI']}"
+    github = ''
+    if 'github.com' in url:
+        github, url = url, ''
+
+    return make_paper(
+        title=title,
+        authors=[csl_name(a) for a in item.get('author', []) if isinstance(a, dict)],
+        venue=venue,
+        year=csl_year(item),
+        volume=str(item.get('volume', '') or ''),
+        number=str(item.get('issue', '') or ''),
+        pages=str(item.get('page', '') or ''),
+        url=url,
+        github=github,
+        source='csl_json',
+        bold_names=bold_names,
+    )
+
+
+def iter_csl_papers(path: Path, bold_names: List[str] = None) -> Iterator[Dict]:
+    """Stream papers from a CSL-JSON file"""
+    for item in iter_json_objects(path):
+        if isinstance(item, dict):
+            paper = csl_to_paper(item, bold_names)
+            if paper:
+                yield paper
+
+
+# ---------------------------------------------------------------------------
+# Shared mapping and import
+# ---------------------------------------------------------------------------
+
+def make_paper(title, authors, venue, year, volume, number, pages, url, github, source, bold_names=None) -> Dict:
+    """Build a papers.json entry, with a Scholar-style citation string"""
+    citation = venue
+    if volume:
+        citation += f" {volume}"
+        if number:
+            citation += f" ({number})"
+    if pages:
+        citation += f", {pages}"
+    if year:
+        citation = f"{citation}, {year}" if citation else str(year)
+
+    return {
+        'title': title,
+        'authors': format_author_list(authors, bold_name=bold_names),
+        'venue': venue,
+        'year': str(year or ''),
+        'citation': citation.strip(),
+        'pdf_link': url or None,
+        'pub_url': url,
+        'eprint_url': '',
+        'github_link': github,
+        'source': source,
+        # Imported papers are kept across Scholar refreshes like manual entries
+        'auto_fetched': False,
+    }
+
+
+def iter_papers(path: Path, bold_names: List[str] = None) -> Iterator[Dict]:
+    """Stream papers from a .bib or CSL-JSON file, chosen by extension"""
+    if path.suffix.lower() in ('.bib', '.bibtex'):
+        return iter_bibtex_papers(path, bold_names)
+    return iter_csl_papers(path, bold_names)
+
+
+def import_bibliographies(paths, papers_json: Path, bold_names: List[str] = None) -> int:
+    """
+    Merge every record from the given files into papers_json, bolding
+    bold_names (e.g. the names in the site's Scholar profiles) in author lists.
+
+    Existing papers go into the PaperIndex first, then imported records are
+    added one at a time as they are parsed, so duplicates (within the files
+    or against papers.json) are merged without materializing the sources.
+    Returns the number of records read.
+    """
+    index = PaperIndex()
+    for paper in load_existing_papers(papers_json):
+        index.add(paper)
+    existing = len(index.papers)
+
+    count = 0
+    for path in paths:
+        print(f"Importing {path}...")
+        for paper in iter_papers(Path(path), bold_names):
+            index.add(paper)
+            count += 1
+            if count % 10000 == 0:
+                print(f"  {count} records, {len(index.papers)} unique papers")
+
+    print(f"Read {count} records: {len(index.papers) - existing} new papers, "
+          f"{count - (len(index.papers) - existing)} merged into existing entries")
+    update_papers_config(index.papers, papers_json, bold_names)
+    return count
+
+
+if __name__ == '__main__':
+    import sys
+
+    from paper_store import papers_file
+
+    args = sys.argv[1:]
+    output = papers_file(Path(__file__).parent / 'njwfish')
+    if '--output' in args:
+        i = args.index('--output')
+        output = Path(args[i + 1])
+        del args[i:i + 2]
+    profiles_file = output.parent / 'scholar_profiles.json'
+    if '--profiles' in args:
+        i = args.index('--profiles')
+        profiles_file = Path(args[i + 1])
+        del args[i:i + 2]
+
+    if not args:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    import_bibliographies(args, output, [p['name'] for p in load_profiles(profiles_file)])
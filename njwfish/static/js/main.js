@@ -93,3 +93,10 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
+
+// Offline support and instant revisits (see templates/sw.js)
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', function() {
+        navigator.serviceWorker.register('/sw.js');
+    });
+}
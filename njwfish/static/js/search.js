@@ -0,0 +1,126 @@
+// Client-side search over the prebuilt index in /static/search/
+(function() {
+    const INDEX_URL = '/static/search/';
+    const STOPWORDS = new Set(['a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'from',
+        'has', 'have', 'i', 'if', 'in', 'into', 'is', 'it', 'its', 'me', 'my', 'not', 'of', 'on', 'or',
+        'so', 'that', 'the', 'their', 'them', 'there', 'these', 'they', 'this', 'to', 'was', 'we',
+        'were', 'what', 'when', 'which', 'who', 'will', 'with', 'you', 'your']);
+
+    let table = null;
+    const shards = new Map();
+
+    function tokenize(text) {
+        return (text.toLowerCase().match(/[a-z0-9]+/g) || [])
+            .filter(t => t.length > 1 && !STOPWORDS.has(t));
+    }
+
+    function loadTable() {
+        if (!table) {
+            table = fetch(INDEX_URL + 'docs.json').then(r => r.json());
+        }
+        return table;
+    }
+
+    // Fetch a shard once; missing shards resolve to an empty posting map
+    function loadShard(prefix, available) {
+        if (!available.has(prefix)) {
+            return Promise.resolve({});
+        }
+        if (!shards.has(prefix)) {
+            shards.set(prefix, fetch(INDEX_URL + prefix + '.json').then(r => r.json()));
+        }
+        return shards.get(prefix);
+    }
+
+    // Every query term must match (as a prefix of) some indexed term
+    async function search(query) {
+        const terms = tokenize(query);
+        if (!terms.length) {
+            return [];
+        }
+        const index = await loadTable();
+        const available = new Set(index.shards);
+        const postingsByTerm = await Promise.all(terms.map(async term => {
+            const shard = await loadShard(term.slice(0, index.prefix), available);
+            const scores = new Map();
+            for (const [indexed, postings] of Object.entries(shard)) {
+                if (indexed.startsWith(term)) {
+                    const exact = indexed === term ? 2 : 1;
+                    for (const [doc, score] of postings) {
+                        scores.set(doc, Math.max(scores.get(doc) || 0, score * exact));
+                    }
+                }
+            }
+            return scores;
+        }));
+
+        const totals = new Map(postingsByTerm[0]);
+        for (const scores of postingsByTerm.slice(1)) {
+            for (const doc of Array.from(totals.keys())) {
+                if (scores.has(doc)) {
+                    totals.set(doc, totals.get(doc) + scores.get(doc));
+                } else {
+                    totals.delete(doc);
+                }
+            }
+        }
+
+        return Array.from(totals.entries())
+            .sort((a, b) => b[1] - a[1])
+            .map(([doc]) => {
+                const [url, title, kind, snippet] = index.docs[doc];
+                return { url, title, kind, snippet };
+            });
+    }
+
+    function render(results, container) {
+        container.innerHTML = '';
+        for (const result of results) {
+            const item = document.createElement('li');
+            item.className = 'post-entry';
+            const link = document.createElement('a');
+            link.href = result.url;
+            link.className = 'post-entry-link';
+            const title = document.createElement('h3');
+            title.className = 'post-entry-title';
+            title.textContent = result.title;
+            const kind = document.createElement('span');
+            kind.className = 'post-entry-date';
+            kind.textContent = result.kind;
+            const snippet = document.createElement('p');
+            snippet.className = 'post-entry-blurb';
+            snippet.textContent = result.snippet;
+            const header = document.createElement('div');
+            header.className = 'post-entry-header';
+            header.append(title, kind);
+            link.append(header, snippet);
+            item.appendChild(link);
+            container.appendChild(item);
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        const input = document.getElementById('search-input');
+        const container = document.getElementById('search-results');
+        if (!input || !container) {
+            return;
+        }
+
+        let pending = 0;
+        async function update() {
+            const query = input.value;
+            const ticket = ++pending;
+            const results = await search(query);
+            if (ticket === pending) {
+                render(results, container);
+            }
+        }
+
+        input.addEventListener('input', update);
+        const initial = new URLSearchParams(window.location.search).get('q');
+        if (initial) {
+            input.value = initial;
+            update();
+        }
+    });
+})();
@@ -0,0 +1,115 @@
+// Service worker generated by build.py from the build outputs; do not edit
+// the copy in site/. Pages, CSS, JS and fonts are precached by content hash,
+// so after a deploy only entries whose hash changed are downloaded again.
+// Everything else on the site (PDFs, images) is cached the first time it
+// is fetched, keeping only the RUNTIME_MAX_ENTRIES most recently stored.
+// The search index is never cached here: its shards refer to docs.json by
+// position, so a cached docs.json must not be mixed with a fresh shard.
+const PRECACHE = 'precache';
+const RUNTIME = 'runtime';
+const RUNTIME_MAX_ENTRIES = 50;
+const UNCACHED_PREFIXES = ['/static/search/'];
+const MANIFEST = {{ manifest|tojson }};
+
+// Cache key for a precached URL: the URL plus its content hash
+function versioned(url) {
+    return url + '?__v=' + MANIFEST[url];
+}
+
+// Map a request path onto the manifest's form (/posts -> /posts/)
+function manifestUrl(pathname) {
+    if (pathname.endsWith('/index.html')) {
+        pathname = pathname.slice(0, -'index.html'.length);
+    } else if (!pathname.endsWith('/') && !pathname.split('/').pop().includes('.')) {
+        pathname += '/';
+    }
+    return pathname in MANIFEST ? pathname : null;
+}
+
+// Drop the oldest runtime entries beyond RUNTIME_MAX_ENTRIES, and any left
+// from before a path was excluded from caching
+async function trimRuntime() {
+    const cache = await caches.open(RUNTIME);
+    const requests = [];
+    for (const request of await cache.keys()) {
+        const pathname = new URL(request.url).pathname;
+        if (UNCACHED_PREFIXES.some(prefix => pathname.startsWith(prefix))) {
+            await cache.delete(request);
+        } else {
+            requests.push(request);
+        }
+    }
+    for (const request of requests.slice(0, Math.max(requests.length - RUNTIME_MAX_ENTRIES, 0))) {
+        await cache.delete(request);
+    }
+}
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(PRECACHE);
+        const missing = [];
+        for (const url of Object.keys(MANIFEST)) {
+            if (!(await cache.match(versioned(url)))) {
+                missing.push(url);
+            }
+        }
+        await Promise.all(missing.map(async url => {
+            const response = await fetch(url, { cache: 'reload' });
+            if (response.ok) {
+                await cache.put(versioned(url), response);
+            }
+        }));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        // Drop entries for old hashes and pages that no longer exist
+        const keep = new Set(Object.keys(MANIFEST).map(url => new URL(versioned(url), self.location).href));
+        const cache = await caches.open(PRECACHE);
+        for (const request of await cache.keys()) {
+            if (!keep.has(request.url)) {
+                await cache.delete(request);
+            }
+        }
+        await trimRuntime();
+        await self.clients.claim();
+    })());
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (request.method !== 'GET' || url.origin !== self.location.origin) {
+        return;
+    }
+    if (UNCACHED_PREFIXES.some(prefix => url.pathname.startsWith(prefix))) {
+        return;
+    }
+
+    const precached = manifestUrl(url.pathname);
+    if (precached) {
+        event.respondWith(
+            caches.match(versioned(precached)).then(response => response || fetch(request))
+        );
+        return;
+    }
+
+    // Serve from the runtime cache, refreshing it in the background
+    event.respondWith((async () => {
+        const cache = await caches.open(RUNTIME);
+        const cached = await cache.match(request);
+        const network = fetch(request).then(response => {
+            if (response.ok) {
+                event.waitUntil(cache.put(request, response.clone()).then(trimRuntime));
+            }
+            return response;
+        });
+        if (cached) {
+            event.waitUntil(network.catch(() => {}));
+            return cached;
+        }
+        return network;
+    })());
+});
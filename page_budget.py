@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Page Weight Budgets
+Works out what each built page loads on a first visit (the HTML itself plus
+stylesheets, scripts, fonts and images, including what the stylesheets pull
+in) and checks the totals against per-page budgets.
+"""
+import re
+from pathlib import Path
+from typing import Dict, List
+
+from asset_graph import CSS_URL_RE, file_url, resolve_reference, url_to_file
+
+
+LINK_RE = re.compile(r'<link\b[^>]*>', re.I)
+SCRIPT_RE = re.compile(r'<script\b[^>]*\bsrc\s*=\s*(["\'])(.*?)\1', re.I)
+IMG_RE = re.compile(r'<img\b[^>]*\bsrc\s*=\s*(["\'])(.*?)\1', re.I)
+ATTR_RE = re.compile(r'\b(rel|href|as)\s*=\s*(["\'])(.*?)\2', re.I)
+
+# rel values of <link>s that make the browser download something
+LOADED_LINK_RELS = {'stylesheet', 'preload', 'icon', 'shortcut icon', 'modulepreload'}
+
+CATEGORIES = {
+    '.css': 'css',
+    '.js': 'js', '.mjs': 'js',
+    '.woff2': 'fonts', '.woff': 'fonts', '.ttf': 'fonts', '.otf': 'fonts',
+    '.png': 'images', '.jpg': 'images', '.jpeg': 'images', '.webp': 'images',
+    '.gif': 'images', '.svg': 'images', '.ico': 'images', '.avif': 'images',
+}
+
+# Budget keys: kilobytes per category, plus request counts
+BUDGET_KEYS = ['total_kb', 'html_kb', 'css_kb', 'js_kb', 'fonts_kb', 'images_kb',
+               'requests', 'third_party_requests']
+
+
+def page_requests(html: str) -> List[str]:
+    """Raw URLs a page downloads while loading (not links it merely points at)"""
+    urls = []
+    for tag in LINK_RE.findall(html):
+        attrs = {k.lower(): v for k, _, v in ATTR_RE.findall(tag)}
+        if attrs.get('rel', '').lower() in LOADED_LINK_RELS and attrs.get('href'):
+            urls.append(attrs['href'])
+    urls.extend(m.group(2) for m in SCRIPT_RE.finditer(html))
+    urls.extend(m.group(2) for m in IMG_RE.finditer(html))
+    # url()s in inline <style> blocks and style attributes
+    urls.extend(m.group(2) for m in CSS_URL_RE.finditer(html))
+    return urls
+
+
+def measure_page(output_dir: Path, page: Path, site_url: str) -> Dict:
+    """Transfer weight by category and request counts for one page"""
+    html = page.read_text(encoding='utf-8')
+    weights = {'html': page.stat().st_size, 'css': 0, 'js': 0, 'fonts': 0, 'images': 0, 'other': 0}
+    local = set()
+    third_party = []
+    missing = []
+
+    queue = [(ref, file_url(output_dir, page)) for ref in page_requests(html)]
+    while queue:
+        ref, base = queue.pop(0)
+        if ref.startswith('data:'):
+            continue
+        url_path = resolve_reference(ref, base, site_url)
+        if url_path is None:
+            if ref.startswith(('http://', 'https://', '//')) and ref not in third_party:
+                third_party.append(ref)
+            continue
+        if url_path in local:
+            continue
+        target = url_to_file(output_dir, url_path)
+        if target is None:
+            missing.append(ref)
+            continue
+        local.add(url_path)
+        weights[CATEGORIES.get(target.suffix.lower(), 'other')] += target.stat().st_size
+        # Stylesheets pull in fonts and background images
+        if target.suffix.lower() == '.css':
+            css = target.read_text(encoding='utf-8')
+            queue.extend((m.group(2), url_path) for m in CSS_URL_RE.finditer(css))
+
+    return {
+        'weights': weights,
+        'total': sum(weights.values()),
+        'requests': 1 + len(local) + len(third_party),
+        'third_party': third_party,
+        'missing': missing,
+    }
+
+
+def budget_for(url: str, budgets: Dict[str, Dict]) -> Dict:
+    """The 'default' budget overlaid with every URL-prefix budget matching url, shortest first"""
+    budget = dict(budgets.get('default', {}))
+    for prefix in sorted((p for p in budgets if p != 'default'), key=len):
+        if url.startswith(prefix):
+            budget.update(budgets[prefix])
+    return budget
+
+
+def check_budget(measured: Dict, budget: Dict) -> List[str]:
+    """Human-readable descriptions of every limit a page exceeds"""
+    actual = {
+        'total_kb': measured['total'] / 1024,
+        'requests': measured['requests'],
+        'third_party_requests': len(measured['third_party']),
+    }
+    for category, size in measured['weights'].items():
+        actual[f"{category}_kb"] = size / 1024
+
+    violations = []
+    for key in BUDGET_KEYS:
+        if key in budget and actual.get(key, 0) > budget[key]:
+            unit = ' KB' if key.endswith('_kb') else ''
+            violations.append(f"{key} {actual[key]:.0f}{unit} > {budget[key]}{unit}")
+    return violations
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+JSON Lines Paper Store
+An alternative to papers.json for large bibliographies: papers.jsonl holds
+one paper per line and papers.jsonl.idx records each line's byte offset and
+section, plus the lines each paper id (a hash of its normalized title)
+appears on, so a paper can be read by id by seeking straight to its line
+and a single paper can be replaced or added without decoding the others.
+Every change is written to a temp file that is renamed over the original,
+so a crash never leaves a half-written store.
+
+Usage:
+    python3 paper_store.py convert njwfish/papers.json njwfish/papers.jsonl
+    python3 paper_store.py export njwfish/papers.jsonl papers.json
+"""
+import bisect
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fetch_scholar import normalize_title
+
+
+SECTIONS = ('published', 'working')
+
+INDEX_SUFFIX = '.idx'
+
+
+def paper_id(paper: Dict) -> str:
+    """Stable id for a paper: a hash of its normalized title"""
+    norm = normalize_title(paper.get('title', ''))
+    return hashlib.sha1(norm.encode('utf-8')).hexdigest()[:16]
+
+
+def atomic_write(path: Path, data: bytes):
+    """Write data to a temp file beside path, then rename it over path"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class PaperStore:
+    """
+    Papers stored as JSON Lines with a sidecar offset index.
+
+    Each line is {"id": ..., "section": "published"|"working", "paper": {...}}.
+    Ids are not unique (untitled papers, or two papers whose titles normalize
+    the same, share one), so the index is keyed by line number and maps each
+    id to all of its lines; every line is a paper.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.index_path = self.path.with_name(self.path.name + INDEX_SUFFIX)
+        self._index: Optional[Dict] = None
+
+    # Index -----------------------------------------------------------------
+
+    def _stamp(self) -> List[int]:
+        """[size, mtime_ns] of the store, which the index is only valid for"""
+        if not self.path.exists():
+            return [0, 0]
+        stat = self.path.stat()
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _load_index(self) -> Dict:
+        """
+        {'lines': [[offset, section], ...], 'ids': {id: [line, ...]}},
+        rebuilt if the sidecar is missing or the store has changed since
+        """
+        if self._index is not None:
+            return self._index
+        try:
+            index = json.loads(self.index_path.read_text())
+            if index.get('stamp') == self._stamp():
+                self._index = {'lines': index['lines'], 'ids': index['ids']}
+                return self._index
+        except (OSError, ValueError, KeyError):
+            pass
+        self._index = self._scan()
+        self._save_index()
+        return self._index
+
+    def _scan(self) -> Dict:
+        lines = []
+        ids: Dict[str, List[int]] = {}
+        if not self.path.exists():
+            return {'lines': lines, 'ids': ids}
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for number, line in enumerate(f):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    raise ValueError(f"{self.path}: line {number + 1} is not a JSON record")
+                lines.append([offset, record['section']])
+                ids.setdefault(record['id'], []).append(number)
+                offset += len(line)
+        return {'lines': lines, 'ids': ids}
+
+    def _save_index(self):
+        index = dict(self._index, stamp=self._stamp())
+        atomic_write(self.index_path, json.dumps(index, separators=(',', ':')).encode('utf-8'))
+
+    # Reading ---------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._load_index()['lines'])
+
+    def __contains__(self, pid: str) -> bool:
+        return pid in self._load_index()['ids']
+
+    def get(self, pid: str) -> List[Tuple[str, Dict]]:
+        """(section, paper) for every paper with id pid, read by seeking to its line"""
+        index = self._load_index()
+        numbers = index['ids'].get(pid, [])
+        if not numbers:
+            return []
+        found = []
+        with open(self.path, 'rb') as f:
+            for number in numbers:
+                f.seek(index['lines'][number][0])
+                record = json.loads(f.readline())
+                found.append((record['section'], record['paper']))
+        return found
+
+    def iter_records(self) -> Iterator[Tuple[str, Dict]]:
+        """Yield (section, paper) for every paper, in file order"""
+        with open(self.path, 'rb') as f:
+            for line in f:
+                record = json.loads(line)
+                yield record['section'], record['paper']
+
+    def to_dict(self) -> Dict[str, List[Dict]]:
+        """The papers in the papers.json layout"""
+        organized = {section: [] for section in SECTIONS}
+        if self.path.exists():
+            for section, paper in self.iter_records():
+                organized.setdefault(section, []).append(paper)
+        return organized
+
+    # Writing ---------------------------------------------------------------
+
+    def put(self, section: str, paper: Dict, pid: Optional[str] = None) -> bool:
+        """
+        Store one paper in section without decoding any other.
+
+        Replaces the paper with id pid (default: the paper's own id, which
+        changes with its title) or, if there is none, adds it as a new last
+        line. The store is rewritten atomically and the index is updated
+        rather than rebuilt. Returns False if nothing would change; raises
+        ValueError if several papers have id pid.
+        """
+        index = self._load_index()
+        pid = pid or paper_id(paper)
+        numbers = index['ids'].get(pid, [])
+        if len(numbers) > 1:
+            raise ValueError(f"{self.path}: {len(numbers)} papers have id {pid}")
+        new_id = paper_id(paper)
+        line = (json.dumps({'id': new_id, 'section': section, 'paper': paper}, ensure_ascii=False) + '\n').encode('utf-8')
+
+        data = self.path.read_bytes() if self.path.exists() else b''
+        lines = index['lines']
+        if numbers:
+            number = numbers[0]
+            start = lines[number][0]
+            end = lines[number + 1][0] if number + 1 < len(lines) else len(data)
+        else:
+            number = len(lines)
+            start = end = len(data)
+        if data[start:end] == line:
+            return False
+        atomic_write(self.path, data[:start] + line + data[end:])
+
+        if numbers:
+            lines[number] = [start, section]
+            for entry in lines[number + 1:]:
+                entry[0] += len(line) - (end - start)
+            del index['ids'][pid]
+        else:
+            lines.append([start, section])
+        bisect.insort(index['ids'].setdefault(new_id, []), number)
+        self._save_index()
+        return True
+
+    def write(self, organized: Dict[str, List[Dict]]) -> bool:
+        """
+        Replace the store's contents with a papers.json-style dict.
+
+        Both files are rewritten atomically. Returns False (and writes
+        nothing) if the contents would not change.
+        """
+        lines = []
+        index = {'lines': [], 'ids': {}}
+        offset = 0
+        for section in organized:
+            for paper in organized[section]:
+                pid = paper_id(paper)
+                record = {'id': pid, 'section': section, 'paper': paper}
+                line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+                index['ids'].setdefault(pid, []).append(len(lines))
+                index['lines'].append([offset, section])
+                lines.append(line)
+                offset += len(line)
+        data = b''.join(lines)
+
+        if self.path.exists() and self.path.read_bytes() == data:
+            return False
+        atomic_write(self.path, data)
+        self._index = index
+        self._save_index()
+        return True
+
+
+def load_papers_data(path: Path) -> Dict[str, List[Dict]]:
+    """Load papers.json or papers.jsonl into the papers.json layout"""
+    path = Path(path)
+    if path.suffix == '.jsonl':
+        return PaperStore(path).to_dict()
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_papers_data(organized: Dict[str, List[Dict]], path: Path) -> bool:
+    """
+    Atomically save papers in the format implied by the path's suffix.
+
+    Returns False if the file already held exactly these papers.
+    """
+    path = Path(path)
+    if path.suffix == '.jsonl':
+        return PaperStore(path).write(organized)
+    data = json.dumps(organized, indent=2, ensure_ascii=False).encode('utf-8')
+    if path.exists() and path.read_bytes() == data:
+        return False
+    atomic_write(path, data)
+    return True
+
+
+def papers_file(source_dir: Path) -> Path:
+    """The site's paper store: papers.jsonl if present, else papers.json"""
+    jsonl = Path(source_dir) / 'papers.jsonl'
+    return jsonl if jsonl.exists() else Path(source_dir) / 'papers.json'
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) != 4 or sys.argv[1] not in ('convert', 'export'):
+        print(__doc__.strip().split('Usage:')[1])
+        sys.exit(1)
+
+    # Both commands copy between formats; the suffixes decide which is which
+    src, dst = Path(sys.argv[2]), Path(sys.argv[3])
+    organized = load_papers_data(src)
+    if isinstance(organized, list):
+        organized = {'published': organized, 'working': []}
+    save_papers_data(organized, dst)
+    total = sum(len(v) for v in organized.values())
+    print(f"Wrote {total} papers from {src} to {dst}")
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Client-side Search Index
+Builds a sharded inverted index over posts, papers and talks at build time.
+The browser downloads a small document table plus only the shards whose
+terms appear in a query (see static/js/search.js).
+"""
+import hashlib
+import html
+import json
+import re
+from pathlib import Path
+from typing import Dict, List
+
+from file_utils import write_if_changed
+
+
+# Terms are sharded by their first SHARD_PREFIX characters
+SHARD_PREFIX = 2
+
+# Relative weight of each document field
+FIELD_WEIGHTS = {'title': 5, 'meta': 3, 'body': 1}
+
+# Cap per-field term frequency so long posts don't drown out titles
+MAX_TERM_FREQUENCY = 5
+
+SNIPPET_LENGTH = 160
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'for', 'from', 'has',
+    'have', 'i', 'if', 'in', 'into', 'is', 'it', 'its', 'me', 'my', 'not', 'of',
+    'on', 'or', 'so', 'that', 'the', 'their', 'them', 'there', 'these', 'they',
+    'this', 'to', 'was', 'we', 'were', 'what', 'when', 'which', 'who', 'will',
+    'with', 'you', 'your',
+}
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def html_to_text(markup: str) -> str:
+    """Strip tags and entities from an HTML fragment"""
+    if not markup:
+        return ""
+    markup = re.sub(r'<(script|style)\b.*?</\1>', ' ', markup, flags=re.S | re.I)
+    text = re.sub(r'<[^>]+>', ' ', markup)
+    return re.sub(r'\s+', ' ', html.unescape(text)).strip()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into index terms"""
+    return [t for t in TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def document_terms(doc: Dict) -> Dict[str, int]:
+    """Score every term in a document by weighted, capped field frequency"""
+    scores: Dict[str, int] = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        counts: Dict[str, int] = {}
+        for term in tokenize(doc.get(field, '')):
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            scores[term] = scores.get(term, 0) + weight * min(count, MAX_TERM_FREQUENCY)
+    return scores
+
+
+def document_hash(doc: Dict) -> str:
+    """Hash the indexed fields of a document"""
+    payload = json.dumps([doc.get(f, '') for f in ('title', 'meta', 'body')], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def post_documents(posts: List[Dict]) -> List[Dict]:
+    """Search documents for blog posts"""
+    docs = []
+    for post in posts:
+        docs.append({
+            'key': f"post:{post['slug']}",
+            'url': f"/posts/{post['slug']}/",
+            'kind': 'post',
+            'title': post['title'],
+            'meta': post.get('blurb', ''),
+            'body': html_to_text(post.get('content', '')),
+            'snippet': post.get('blurb', ''),
+        })
+    return docs
+
+
+def paper_documents(papers: List[Dict]) -> List[Dict]:
+    """Search documents for papers (title, authors, venue)"""
+    docs = []
+    for paper in papers:
+        title = html_to_text(paper.get('title', ''))
+        if not title:
+            continue
+        authors = html_to_text(paper.get('authors', ''))
+        venue = paper.get('venue', '') or ''
+        year = paper.get('year', '') or ''
+        url = paper.get('pub_url') or paper.get('pdf_link') or paper.get('eprint_url') or '/papers/'
+        key = hashlib.sha1(title.lower().encode('utf-8')).hexdigest()[:12]
+        docs.append({
+            'key': f"paper:{key}",
+            'url': url,
+            'kind': 'paper',
+            'title': title,
+            'meta': f"{authors} {venue} {year}",
+            'body': '',
+            'snippet': ', '.join(p for p in (authors, venue, year) if p),
+        })
+    return docs
+
+
+def talk_documents(talks: List[Dict]) -> List[Dict]:
+    """Search documents for talks"""
+    docs = []
+    for talk in talks:
+        title = talk.get('title', '')
+        if not title:
+            continue
+        venue = talk.get('venue', '') or ''
+        location = talk.get('location', '') or ''
+        date = talk.get('date', '') or ''
+        key = hashlib.sha1(f"{title}|{venue}|{date}".lower().encode('utf-8')).hexdigest()[:12]
+        docs.append({
+            'key': f"talk:{key}",
+            'url': talk.get('slides') or '/talks/',
+            'kind': 'talk',
+            'title': title,
+            'meta': f"{venue} {location} {date}",
+            'body': talk.get('description', '') or '',
+            'snippet': ', '.join(p for p in (venue, location, date) if p),
+        })
+    return docs
+
+
+def _dump(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def build_search_index(documents: List[Dict], output_dir: Path, cache_file: Path) -> Dict:
+    """
+    Build the sharded index into output_dir.
+
+    Term scores are cached per document by content hash, so only new or
+    edited documents are re-tokenized. Shard files are rewritten only when
+    their bytes change.
+    """
+    cache = {}
+    if cache_file.exists():
+        try:
+            cache = json.loads(cache_file.read_text())
+        except ValueError:
+            cache = {}
+
+    documents = sorted(documents, key=lambda d: d['key'])
+    new_cache = {}
+    reindexed = 0
+    for doc in documents:
+        digest = document_hash(doc)
+        cached = cache.get(doc['key'])
+        if cached and cached['hash'] == digest:
+            new_cache[doc['key']] = cached
+        else:
+            new_cache[doc['key']] = {'hash': digest, 'terms': document_terms(doc)}
+            reindexed += 1
+
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    cache_file.write_text(json.dumps(new_cache, sort_keys=True))
+
+    # Shard postings: {prefix: {term: [[doc, score], ...]}}
+    shards: Dict[str, Dict[str, List[List[int]]]] = {}
+    for doc_id, doc in enumerate(documents):
+        for term, score in new_cache[doc['key']]['terms'].items():
+            shard = shards.setdefault(term[:SHARD_PREFIX], {})
+            shard.setdefault(term, []).append([doc_id, score])
+
+    table = {
+        'prefix': SHARD_PREFIX,
+        'shards': sorted(shards),
+        'docs': [
+            [d['url'], d['title'], d['kind'], d['snippet'][:SNIPPET_LENGTH]] for d in documents
+        ],
+    }
+
+    write_if_changed(output_dir / 'docs.json', _dump(table))
+    for prefix, postings in shards.items():
+        write_if_changed(output_dir / f"{prefix}.json", _dump(postings))
+
+    # Remove shards whose terms no longer exist
+    for stale in output_dir.glob('*.json'):
+        if stale.stem != 'docs' and stale.stem not in shards:
+            stale.unlink()
+
+    return {
+        'documents': len(documents),
+        'reindexed': reindexed,
+        'shards': len(shards),
+    }
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Site Configuration
+Everything that differs between the sites one build.py run can build: where
+a site's sources, output and per-site caches live, its public URL, and the
+name and description used in page titles. Caches keyed by content (Jinja
+bytecode, rendered Markdown, the asset store, image/PDF/font derivatives)
+are shared by every site and configured in build.py.
+
+Sites are listed in sites.json:
+
+    [
+        {"name": "njwfish", "source_dir": "njwfish", "output_dir": "site",
+         "site_url": "https://njw.fish", "title": "Nic Fishman",
+         "description": "PhD student in Statistics at Harvard University",
+         "author": "Nic Fishman", "cv_dir": "latex_cv"}
+    ]
+"""
+import copy
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class SiteConfig:
+    """
+    One site to build.
+
+    `output_dir` is where the live site appears: a symlink to the current
+    build in `builds_dir` (see staged_output.py).
+    `title` is the name pages and feeds are titled with ("Posts - <title>"),
+    and `author` (default: title) the name feeds and the CV credit.
+    `cv_dir` is the LaTeX CV directory, or None for sites without a CV, and
+    `cv_templates` its section templates (default: cv_dir/templates). With
+    `scholar` False, or no `scholar_profiles` file (default:
+    source_dir/scholar_profiles.json), the Google Scholar fetch is skipped.
+    """
+
+    def __init__(self, name: str, source_dir: Path, output_dir: Path, site_url: str,
+                 title: str, description: str, cache_dir: Path,
+                 cv_dir: Optional[Path] = None, scholar: bool = True, author: Optional[str] = None,
+                 scholar_profiles: Optional[Path] = None, cv_templates: Optional[Path] = None):
+        self.name = name
+        self.source_dir = Path(source_dir)
+        self.output_dir = Path(output_dir)
+        self.builds_dir = self.output_dir.with_name(f"{self.output_dir.name}.builds")
+        self.site_url = site_url.rstrip('/')
+        self.title = title
+        self.author = author or title
+        self.description = description
+        self.cache_dir = Path(cache_dir)
+        self.cv_dir = Path(cv_dir) if cv_dir else None
+        self.cv_templates_dir = Path(cv_templates) if cv_templates else (
+            self.cv_dir / 'templates' if self.cv_dir else None)
+        self.scholar = scholar
+
+        # Sources
+        self.static_dir = self.source_dir / 'static'
+        self.templates_dir = self.source_dir / 'templates'
+        self.posts_dir = self.static_dir / 'posts'
+        self.talks_file = self.source_dir / 'talks.json'
+        # Group members whose Scholar profiles are aggregated (see fetch_scholar.py)
+        self.scholar_profiles_file = (Path(scholar_profiles) if scholar_profiles
+                                      else self.source_dir / 'scholar_profiles.json')
+        # Overrides for build.PAGE_BUDGETS
+        self.budgets_file = self.source_dir / 'budgets.json'
+
+        # State from this site's previous build
+        self.manifest_file = self.cache_dir / 'manifest.json'
+        self.scholar_partial_file = self.cache_dir / 'scholar_partial.jsonl'
+        self.search_cache_file = self.cache_dir / 'search_index.json'
+        self.critical_css_cache_file = self.cache_dir / 'critical_css.json'
+        self.budget_report_file = self.cache_dir / 'budget_report.json'
+        self.latex_build_dir = self.cache_dir / 'latex'
+        # Generated CV sections, which xelatex finds as resume/<section>.tex
+        # through TEXINPUTS, so the source tree is never written to
+        self.cv_sections_dir = self.latex_build_dir / 'sections'
+
+    def staged(self, output_dir: Path) -> 'SiteConfig':
+        """A copy of this site that writes its output to output_dir"""
+        staged = copy.copy(self)
+        staged.output_dir = Path(output_dir)
+        return staged
+
+    def __repr__(self):
+        return f"SiteConfig({self.name!r}, source_dir={str(self.source_dir)!r}, output_dir={str(self.output_dir)!r})"
+
+
+def site_from_dict(data: Dict, cache_root: Path) -> SiteConfig:
+    """A SiteConfig from one sites.json entry; its caches go in cache_root/<name>"""
+    name = data['name']
+    return SiteConfig(
+        name=name,
+        source_dir=Path(data.get('source_dir', name)),
+        output_dir=Path(data.get('output_dir', f"site-{name}")),
+        site_url=data['site_url'],
+        title=data.get('title', name),
+        description=data.get('description', ''),
+        cache_dir=cache_root / name,
+        cv_dir=data.get('cv_dir'),
+        scholar=data.get('scholar', True),
+        author=data.get('author'),
+        scholar_profiles=data.get('scholar_profiles'),
+        cv_templates=data.get('cv_templates'),
+    )
+
+
+def load_sites(path: Path, cache_root: Path) -> List[SiteConfig]:
+    """Sites listed in a sites.json file, with duplicate names or outputs rejected"""
+    with open(path, encoding='utf-8') as f:
+        sites = [site_from_dict(entry, cache_root) for entry in json.load(f)]
+    for attr in ('name', 'output_dir'):
+        values = [str(getattr(site, attr)) for site in sites]
+        duplicates = sorted({v for v in values if values.count(v) > 1})
+        if duplicates:
+            raise ValueError(f"Sites in {path} share a {attr}: {duplicates}")
+    return sites
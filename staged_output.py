@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Staged Output
+Every build of a site writes into a fresh directory under <output>.builds/
+and is published by atomically repointing the <output> symlink at it, so
+the live site is always one complete build and older builds stay around
+for rollback:
+
+    site -> site.builds/20240101-120000
+    site.builds/
+        20231231-090000/
+        20240101-120000/
+
+A staging directory starts empty, so a file the build stops producing is
+not carried over. Once the build is complete, every file whose bytes match
+the same path in the live build is replaced by a hardlink to it, so
+unchanged files are shared between builds rather than stored twice. Builds
+are never written to after they are finished.
+"""
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import List, Optional
+
+
+STAGING_PREFIX = '.staging-'
+
+# A staging directory untouched for this long (seconds) was left by an
+# interrupted build; younger ones may belong to a build still running
+STAGING_STALE_AFTER = 24 * 3600
+
+
+def current_build(live: Path) -> Optional[Path]:
+    """The build directory live points at (live itself if it is a plain directory), or None"""
+    if live.is_symlink():
+        target = live.resolve()
+        return target if target.is_dir() else None
+    return live if live.is_dir() else None
+
+
+def list_builds(builds_dir: Path) -> List[Path]:
+    """Finished builds, oldest first"""
+    if not builds_dir.exists():
+        return []
+    return sorted(p for p in builds_dir.iterdir() if p.is_dir() and not p.name.startswith('.'))
+
+
+def new_staging_dir(builds_dir: Path) -> Path:
+    """Create an empty staging directory for a new build"""
+    builds_dir.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    for n in range(1000):
+        name = stamp if n == 0 else f"{stamp}-{n}"
+        staging = builds_dir / f"{STAGING_PREFIX}{name}"
+        if not staging.exists() and not (builds_dir / name).exists():
+            staging.mkdir()
+            return staging
+    raise RuntimeError(f"Could not create a staging directory in {builds_dir}")
+
+
+def same_bytes(a: Path, b: Path) -> bool:
+    """Whether two files hold identical bytes"""
+    if a.stat().st_size != b.stat().st_size:
+        return False
+    with open(a, 'rb') as fa, open(b, 'rb') as fb:
+        while True:
+            chunk = fa.read(1 << 16)
+            if chunk != fb.read(1 << 16):
+                return False
+            if not chunk:
+                return True
+
+
+def share_unchanged(staging: Path, previous: Path) -> int:
+    """
+    Replace each file in staging that is byte-identical to the same path in
+    previous with a hardlink to it, returning how many files are shared
+    """
+    shared = 0
+    for path in sorted(p for p in staging.rglob('*') if p.is_file()):
+        old = previous / path.relative_to(staging)
+        if not old.is_file():
+            continue
+        if not os.path.samefile(path, old):
+            if not same_bytes(path, old):
+                continue
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            try:
+                os.link(old, tmp)
+            except OSError:
+                # Different filesystems: keep the copy
+                continue
+            os.replace(tmp, path)
+        shared += 1
+    return shared
+
+
+def finish_build(staging: Path) -> Path:
+    """Rename a completed staging directory to its build name"""
+    build = staging.with_name(staging.name[len(STAGING_PREFIX):])
+    os.replace(staging, build)
+    return build
+
+
+def publish_build(live: Path, build: Path):
+    """
+    Point live at build with an atomic symlink swap.
+
+    A plain directory at live (from before builds were staged) is first
+    moved into the builds directory, so it is kept like any other build.
+    """
+    if live.exists() and not live.is_symlink():
+        os.replace(live, build.with_name(f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(live.stat().st_mtime))}-unstaged"))
+    tmp = live.with_name(f".{live.name}.{os.getpid()}.tmp")
+    if tmp.is_symlink():
+        tmp.unlink()
+    os.symlink(os.path.relpath(build, live.parent), tmp)
+    os.replace(tmp, live)
+
+
+def prune_builds(builds_dir: Path, keep: int, live: Path) -> List[Path]:
+    """
+    Delete all but the newest `keep` builds (never the live one) and any
+    staging directory untouched for STAGING_STALE_AFTER (so left by an
+    interrupted build), returning what was deleted
+    """
+    current = current_build(live)
+    builds = list_builds(builds_dir)
+    stale = [b for b in builds[:max(len(builds) - keep, 0)] if b != current]
+    cutoff = time.time() - STAGING_STALE_AFTER
+    stale += sorted(p for p in builds_dir.glob(f"{STAGING_PREFIX}*") if p.stat().st_mtime < cutoff)
+    for path in stale:
+        shutil.rmtree(path, ignore_errors=True)
+    return stale
+
+
+def rollback(live: Path, builds_dir: Path) -> Optional[Path]:
+    """Point live at the build before the current one, returning it (None if there is none)"""
+    builds = list_builds(builds_dir)
+    current = current_build(live)
+    older = [b for b in builds if current is None or b.name < current.name]
+    if not older:
+        return None
+    publish_build(live, older[-1])
+    return older[-1]
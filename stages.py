@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Build Stage Scheduler
+A small task-graph executor for the site build. Each stage names the stages
+whose outputs it consumes; a stage starts as soon as all of its inputs are
+ready, so independent stages run concurrently and total wall-clock time is
+bounded by the longest dependency chain rather than the sum of all stages.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class Stage:
+    """
+    A unit of build work.
+
+    `func` is called with one keyword argument per name in `requires`, bound
+    to that stage's return value. The stage's own return value is its output,
+    available to dependants under the stage's name.
+    """
+
+    def __init__(self, name: str, func: Callable, requires: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.requires = tuple(requires)
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, requires={self.requires!r})"
+
+
+def check_graph(stages: List[Stage]):
+    """Raise ValueError for duplicate names, unknown inputs or cycles"""
+    names = [s.name for s in stages]
+    duplicates = {n for n in names if names.count(n) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate stage names: {sorted(duplicates)}")
+
+    by_name = {s.name: s for s in stages}
+    for stage in stages:
+        missing = [r for r in stage.requires if r not in by_name]
+        if missing:
+            raise ValueError(f"Stage {stage.name!r} requires unknown stages: {missing}")
+
+    # Kahn's algorithm: anything left over is on a cycle
+    remaining = {s.name: set(s.requires) for s in stages}
+    while True:
+        ready = [n for n, deps in remaining.items() if not deps]
+        if not ready:
+            break
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    if remaining:
+        raise ValueError(f"Dependency cycle between stages: {sorted(remaining)}")
+
+
+def run_stages(stages: List[Stage], max_workers: Optional[int] = None, verbose: bool = True) -> Dict:
+    """
+    Run stages on a thread pool in dependency order.
+
+    Returns a dict of stage name -> output. If a stage raises, no further
+    stages are started, running ones are allowed to finish, and the first
+    exception is re-raised.
+    """
+    check_graph(stages)
+
+    results: Dict[str, object] = {}
+    timings: Dict[str, float] = {}
+    pending = {s.name: s for s in stages}
+    running = {}
+    error = None
+
+    def start_ready(pool):
+        for name, stage in list(pending.items()):
+            if all(r in results for r in stage.requires):
+                kwargs = {r: results[r] for r in stage.requires}
+                running[pool.submit(_timed, stage.func, kwargs)] = stage
+                del pending[name]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        start_ready(pool)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name], timings[stage.name] = future.result()
+                except Exception as e:
+                    if error is None:
+                        error = e
+                        print(f"Error in build stage '{stage.name}': {e}")
+            if error is None:
+                start_ready(pool)
+
+    if error is not None:
+        raise error
+
+    if verbose:
+        total = time.perf_counter() - start
+        serial = sum(timings.values())
+        print(f"\nBuild stages: {total:.2f}s wall clock ({serial:.2f}s if run serially)")
+        for name, seconds in sorted(timings.items(), key=lambda kv: -kv[1]):
+            print(f"  {name:<16} {seconds:.2f}s")
+
+    return results
+
+
+def _timed(func, kwargs):
+    start = time.perf_counter()
+    value = func(**kwargs)
+    return value, time.perf_counter() - start
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Venue Classification
+One place that decides whether a paper is published or a working paper, and
+that expands the truncated venue strings Google Scholar returns into their
+full names. Used by fetch_scholar.organize_papers(), build.load_papers() and
+generate_cv_papers.py so every page and the CV agree.
+"""
+import re
+from functools import lru_cache
+from typing import Dict
+
+
+# Words and phrases that mark a venue as a publication venue. Matched as whole
+# words, so 'opt' matches "OPT 2024" but not "adaptive", and 'acm' not "macmillan".
+PUBLICATION_INDICATORS = [
+    'science', 'nature', 'neurips', 'advances in neural', 'neural information processing',
+    'proceedings', 'journals?', 'conferences?', 'transactions', 'icml', 'acl', 'opt', 'acm',
+    'fairness', 'accountability', 'ijcai', 'aaai', 'iclr', 'jmlr', 'pami', 'cvpr', 'eccv', 'iccv',
+]
+
+PUBLICATION_RE = re.compile(r'\b(?:' + '|'.join(PUBLICATION_INDICATORS) + r')\b', re.I)
+ARXIV_RE = re.compile(r'\barxiv\b', re.I)
+IN_PREPARATION_RE = re.compile(r'\bin prep(?:aration)?\b', re.I)
+
+# Scholar truncates long venue names with an ellipsis; each pattern maps a
+# (possibly truncated) venue onto its full name. {year} is filled in when the
+# name includes one.
+CANONICAL_VENUES = [
+    (re.compile(r'\bfairness,? accountability\b', re.I),
+     "Proceedings of the {year} ACM Conference on Fairness, Accountability, and Transparency",
+     "Proceedings of the ACM Conference on Fairness, Accountability, and Transparency"),
+    (re.compile(r'^advances in neural information\b', re.I),
+     "Advances in Neural Information Processing Systems",
+     "Advances in Neural Information Processing Systems"),
+    (re.compile(r'^proceedings of the national academy\b', re.I),
+     "Proceedings of the National Academy of Sciences",
+     "Proceedings of the National Academy of Sciences"),
+    (re.compile(r'^journal of the american statistical\b', re.I),
+     "Journal of the American Statistical Association",
+     "Journal of the American Statistical Association"),
+]
+
+YEAR_RE = re.compile(r'\b(?:19|20)\d{2}\b')
+
+
+@lru_cache(maxsize=None)
+def canonical_venue(venue: str) -> str:
+    """
+    Full name for a truncated Scholar venue string.
+
+    Venues that are not in CANONICAL_VENUES are returned unchanged, so this
+    is safe to apply to every venue.
+    """
+    if not venue:
+        return ""
+    for pattern, with_year, without_year in CANONICAL_VENUES:
+        if pattern.search(venue):
+            year = YEAR_RE.search(venue)
+            return with_year.format(year=year.group(0)) if year else without_year
+    return venue
+
+
+@lru_cache(maxsize=None)
+def classify_venue(venue: str, citation: str = '') -> str:
+    """Classify a paper as 'published' or 'working' from its venue and citation"""
+    # arXiv-only papers are working papers unless they also name a venue
+    if ARXIV_RE.search(venue) and not (PUBLICATION_RE.search(venue) or PUBLICATION_RE.search(citation)):
+        return 'working'
+    if IN_PREPARATION_RE.search(venue):
+        return 'working'
+    if PUBLICATION_RE.search(venue) or PUBLICATION_RE.search(citation):
+        return 'published'
+    # Default to working if no clear publication indicator
+    return 'working'
+
+
+def classify_paper(paper: Dict) -> str:
+    """Classify a papers.json entry as 'published' or 'working'"""
+    return classify_venue((paper.get('venue') or '').strip(), (paper.get('citation') or '').strip())
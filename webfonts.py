@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Web Font Subsetting
+Finds the @font-face rules a stylesheet actually uses, subsets each font to
+the characters that appear on the rendered pages, converts it to WOFF2 and
+rewrites the rules to point at the subsets. Needs fontTools (and brotli for
+WOFF2 output).
+"""
+import hashlib
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+
+FONT_FACE_RE = re.compile(r'@font-face\s*\{([^}]*)\}', re.I)
+DECLARATION_RE = re.compile(r'([\w-]+)\s*:\s*([^;]+)')
+URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+WEIGHT_RE = re.compile(r'font-weight\s*:\s*(\d{3}|bold|normal)', re.I)
+ITALIC_RE = re.compile(r'font-style\s*:\s*(?:italic|oblique)', re.I)
+
+# Elements the browser renders in bold or italic without any CSS
+BOLD_TAGS_RE = re.compile(r'<(?:b|strong|h[1-6]|th)\b', re.I)
+ITALIC_TAGS_RE = re.compile(r'<(?:i|em|cite)\b', re.I)
+
+# Always kept, so text added client-side (e.g. search results) still renders
+BASE_CHARACTERS = ''.join(chr(c) for c in range(0x20, 0x7f))
+
+
+def parse_font_faces(css: str) -> List[Dict]:
+    """Parse @font-face rules into dicts with family, weight, style, urls and the rule's span"""
+    faces = []
+    for match in FONT_FACE_RE.finditer(css):
+        decls = {k.lower(): v.strip() for k, v in DECLARATION_RE.findall(match.group(1))}
+        family = decls.get('font-family', '').strip('\'"')
+        if not family:
+            continue
+        faces.append({
+            'family': family,
+            'weight': css_weight(decls.get('font-weight', '400')),
+            'style': decls.get('font-style', 'normal').lower(),
+            'urls': [m.group(2) for m in URL_RE.finditer(decls.get('src', ''))],
+            'span': match.span(),
+        })
+    return faces
+
+
+def css_weight(value: str) -> int:
+    """Numeric font weight for a CSS font-weight value"""
+    value = value.strip().lower()
+    if value == 'bold':
+        return 700
+    if value.isdigit():
+        return int(value)
+    return 400
+
+
+def used_faces(css: str, pages: Iterable[str]) -> List[Dict]:
+    """
+    The @font-face rules whose family the stylesheet names outside its
+    @font-face rules, restricted to the weights and styles it can render.
+    """
+    faces = parse_font_faces(css)
+    rest = FONT_FACE_RE.sub('', css)
+    weights = {css_weight(w) for w in WEIGHT_RE.findall(rest)} | {400}
+    italic = bool(ITALIC_RE.search(rest))
+    for page in pages:
+        if 700 not in weights and BOLD_TAGS_RE.search(page):
+            weights.add(700)
+        if not italic and ITALIC_TAGS_RE.search(page):
+            italic = True
+
+    used = []
+    for face in faces:
+        if not re.search(r'[\'"\s,:]' + re.escape(face['family']) + r'[\'"\s,;]', rest):
+            continue
+        if face['weight'] not in weights:
+            continue
+        if face['style'] != 'normal' and not italic:
+            continue
+        used.append(face)
+    return used
+
+
+def glyph_set(texts: Iterable[str]) -> str:
+    """Sorted, de-duplicated characters across texts (plus printable ASCII)"""
+    chars: Set[str] = set(BASE_CHARACTERS)
+    for text in texts:
+        chars.update(text)
+    return ''.join(sorted(c for c in chars if c.isprintable()))
+
+
+def subset_font(src: Path, chars: str, cache_dir: Path) -> Optional[Path]:
+    """
+    Subset src to chars as WOFF2, cached by font and glyph-set hash.
+
+    Returns the cached file, or None if fontTools is unavailable.
+    """
+    key = hashlib.sha256(src.read_bytes() + chars.encode('utf-8')).hexdigest()[:16]
+    out = cache_dir / f"{src.stem}-{key}.woff2"
+    if out.exists():
+        return out
+    try:
+        from fontTools import subset
+    except ImportError:
+        return None
+
+    options = subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    options.name_IDs = ['*']
+    font = subset.load_font(str(src), options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=[ord(c) for c in chars])
+    subsetter.subset(font)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Unique per thread, as sites built in parallel may subset the same font
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    subset.save_font(font, str(tmp), options)
+    tmp.replace(out)
+    return out
+
+
+def rewrite_css(css: str, replacements: Dict[tuple, str]) -> str:
+    """
+    Replace @font-face rules by span: each span maps to the new rule text,
+    or to '' to drop the rule.
+    """
+    parts = []
+    last = 0
+    for (start, end), rule in sorted(replacements.items()):
+        parts.append(css[last:start])
+        parts.append(rule)
+        last = end
+    parts.append(css[last:])
+    return ''.join(parts)
+
+
+def font_face_rule(face: Dict, url: str) -> str:
+    """An @font-face rule for a WOFF2 subset"""
+    return (
+        "@font-face {\n"
+        f"    font-family: '{face['family']}';\n"
+        f"    font-weight: {face['weight']};\n"
+        f"    font-style: {face['style']};\n"
+        "    font-display: swap;\n"
+        f"    src: url('{url}') format('woff2');\n"
+        "}"
+    )